@@ -1,6 +1,26 @@
+import sys
+
 from .handler import OpenTracingHandler
 from .formatter import OpenTracingFormatter, OpenTracingFormatterABC
+from .logger import SpanAwareLogger
+
+
+def _get_version() -> str:
+    """
+    Resolve the version of the package. In a source checkout this can spawn git subprocesses.
+    """
+    from ._version import get_versions
+    return get_versions()['version']
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name: str):
+        # the version is only resolved when it is accessed for the first time to keep the import cheap
+        if name == '__version__':
+            version = globals()['__version__'] = _get_version()
+            return version
 
-from ._version import get_versions
-__version__ = get_versions()['version']
-del get_versions
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+else:
+    # module level __getattr__ is only available since Python 3.7
+    __version__ = _get_version()
@@ -0,0 +1,66 @@
+"""
+Rendering of the time of records for the OpenTracingFormatter
+"""
+
+from logging import Formatter, LogRecord
+from typing import Optional
+
+
+class AsctimeRenderer:
+    """
+    Render the time of records like :meth:`logging.Formatter.formatTime` and cache the rendered second, such that
+    ``time.localtime`` and ``time.strftime`` are only called once per second instead of once per record. Without a date
+    format, only the milliseconds are added to the cached second for each record.
+
+    The cache is a single tuple which is replaced as a whole, such that threads can share the renderer without a lock.
+    """
+
+    def __init__(self, date_format: Optional[str] = None):
+        """
+        :param date_format: Date format as for the parameter ``datefmt`` of :class:`logging.Formatter`
+        """
+        self._date_format = date_format
+        #: Formatter which renders the seconds that are not cached
+        self._formatter = Formatter(datefmt=date_format)
+        #: Pair of the last rendered second and its text
+        self._cache = (None, None)
+
+    def render(self, record: LogRecord) -> str:
+        """
+        Render the time of a record
+
+        :param record: Logging record
+        :return: The time in the same format as :meth:`logging.Formatter.formatTime`
+        """
+        second = int(record.created)
+        cached_second, text = self._cache
+
+        if cached_second != second:
+            text = self._render_second(created=record.created)
+            self._cache = (second, text)
+
+        msec_format = self._formatter.default_msec_format
+
+        if self._date_format or not msec_format:
+            return text
+
+        return msec_format % (text, record.msecs)
+
+    def _render_second(self, created: float) -> str:
+        """
+        Render the time without milliseconds
+        """
+        formatter = self._formatter
+        return formatter.formatTime(_SecondRecord(created=created), self._date_format or formatter.default_time_format)
+
+
+class _SecondRecord:
+    """
+    Minimal record which is passed to :meth:`logging.Formatter.formatTime` to render a second
+    """
+
+    __slots__ = ('created', 'msecs')
+
+    def __init__(self, created: float):
+        self.created = created
+        self.msecs = 0
@@ -0,0 +1,245 @@
+"""
+Micro-benchmarks for the hot path of the OpenTracingHandler and the OpenTracingFormatter
+
+Run the benchmarks with
+
+.. code-block:: bash
+
+   python -m logging_opentracing.bench --iterations 10000 --repeat 5
+
+The results are printed as JSON.
+"""
+
+from argparse import ArgumentParser
+from contextlib import contextmanager
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict, Iterator, List, Optional
+
+from opentracing import Span, Tracer
+from opentracing.mocktracer import MockTracer
+
+from . import __version__
+from .formatter import OpenTracingFormatter
+from .handler import OpenTracingHandler
+
+#: Wide custom format which is used by the scenario ``wide_format``
+WIDE_FORMAT = {
+    'event': '%(levelname_lower)s',
+    'message': '%(message)s',
+    'logger': '%(name)s',
+    'source': '%(filename)s:L%(lineno)d',
+    'function': '%(funcName)s',
+    'module': '%(module)s',
+    'process': '%(process)d',
+    'thread': '%(threadName)s',
+    'time': '%(asctime)s',
+    'service': 'bench',
+}
+
+#: Additional key-values which are used by the scenario ``extra_kv``
+EXTRA_KV = {'user': 'brian', 'attempt': 3, 'items': [1, 2, 3]}
+
+#: Tracers which can be used for the benchmarks
+TRACERS = {
+    'mock': MockTracer,
+    'noop': Tracer,
+}
+
+#: Functions which are benchmarked
+TARGETS = ('emit', 'format')
+
+
+class Scenario:
+    """
+    A benchmark scenario defines the format, the records and whether a span is active
+    """
+
+    def __init__(self, kv_format: Optional[Dict[str, str]] = None, extra_kv: bool = False, exception: bool = False,
+                 active_span: bool = True, pass_span: bool = False, mutate_record: bool = True):
+        """
+        :param kv_format: Format of the formatter. The default format is used if it is not set.
+        :param mutate_record: Let the formatter store derived attributes on the records
+        :param extra_kv: Pass additional key-values with each record
+        :param exception: Attach exception information to each record
+        :param active_span: Log in an active span
+        :param pass_span: Pass a span with each record
+        """
+        self.kv_format = kv_format
+        self.extra_kv = extra_kv
+        self.exception = exception
+        self.active_span = active_span
+        self.pass_span = pass_span
+        self.mutate_record = mutate_record
+
+    def create_records(self, count: int, span: Optional[Span]) -> List[logging.LogRecord]:
+        """
+        Create the records for a benchmark run. Each run needs fresh records because formatting caches some values in
+        the records.
+
+        :param count: Number of records
+        :param span: Span which is passed with the records if ``pass_span`` is set
+        :return: Records
+        """
+        extra = dict()
+
+        if self.extra_kv:
+            extra['kv'] = EXTRA_KV
+        if self.pass_span:
+            extra['span'] = span
+
+        exc_info = None
+
+        if self.exception:
+            try:
+                1 / 0
+            except ZeroDivisionError:
+                exc_info = sys.exc_info()
+
+        logger = logging.getLogger(__name__)
+
+        return [logger.makeRecord(logger.name, logging.INFO, __file__, 42, 'Benchmark log %d of %s', (i, 'bench'),
+                                  exc_info, func='bench', extra=extra) for i in range(count)]
+
+
+#: Available scenarios
+SCENARIOS = {
+    'default': Scenario(),
+    'wide_format': Scenario(kv_format=WIDE_FORMAT),
+    'extra_kv': Scenario(extra_kv=True),
+    'exception': Scenario(exception=True),
+    'no_span': Scenario(active_span=False),
+    'span_passed': Scenario(active_span=False, pass_span=True),
+    'no_mutation': Scenario(mutate_record=False),
+    'wide_format_no_mutation': Scenario(kv_format=WIDE_FORMAT, mutate_record=False),
+}
+
+
+@contextmanager
+def _span_context(tracer: Tracer, scenario: Scenario) -> Iterator[Optional[Span]]:
+    """
+    Activate or create the span of a scenario
+    """
+    if scenario.active_span:
+        with tracer.start_active_span('bench') as scope:
+            yield scope.span
+    elif scenario.pass_span:
+        with tracer.start_span('bench') as span:
+            yield span
+    else:
+        yield None
+
+
+def run(scenario_name: str, tracer_name: str, target: str, iterations: int, repeat: int, memory: bool = False) -> Dict:
+    """
+    Run a single benchmark
+
+    :param scenario_name: Key of :data:`SCENARIOS`
+    :param tracer_name: Key of :data:`TRACERS`
+    :param target: Function to benchmark, one of :data:`TARGETS`
+    :param iterations: Number of records per run
+    :param repeat: Number of runs
+    :param memory: Additionally measure with :mod:`tracemalloc` how many bytes per record remain allocated while the
+        records are alive, e.g. for attributes which are stored on the records
+    :return: Result of the benchmark
+    """
+    scenario = SCENARIOS[scenario_name]
+    tracer = TRACERS[tracer_name]()
+    formatter = OpenTracingFormatter(kv_format=scenario.kv_format, mutate_record=scenario.mutate_record)
+    handler = OpenTracingHandler(tracer=tracer, formatter=formatter)
+
+    func = handler.emit if target == 'emit' else formatter.format
+    durations = []
+
+    for _ in range(repeat):
+        with _span_context(tracer=tracer, scenario=scenario) as span:
+            records = scenario.create_records(count=iterations, span=span)
+
+            start = time.perf_counter()
+            for record in records:
+                func(record)
+            durations.append(time.perf_counter() - start)
+
+    best = min(durations)
+    result = {
+        'scenario': scenario_name,
+        'tracer': tracer_name,
+        'target': target,
+        'records': iterations,
+        'best_ns_per_record': best / iterations * 1e9,
+        'median_ns_per_record': statistics.median(durations) / iterations * 1e9,
+        'records_per_second': iterations / best if best > 0 else None,
+    }
+
+    if memory:
+        result['retained_bytes_per_record'] = _retained_bytes(func=func, tracer=tracer, scenario=scenario,
+                                                              iterations=iterations)
+
+    return result
+
+
+def _retained_bytes(func, tracer: Tracer, scenario: Scenario, iterations: int) -> float:
+    """
+    Measure how many bytes per record remain allocated after the records have been processed
+    """
+    with _span_context(tracer=tracer, scenario=scenario) as span:
+        records = scenario.create_records(count=iterations, span=span)
+
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            for record in records:
+                func(record)
+            after = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+    return (after - before) / iterations
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the benchmarks from the command line
+
+    :param argv: Command line arguments. ``sys.argv`` is used if it is not set.
+    :return: Exit code
+    """
+    parser = ArgumentParser(prog='python -m logging_opentracing.bench', description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--iterations', type=int, default=10000, help='number of records per run')
+    parser.add_argument('--repeat', type=int, default=5, help='number of runs of each benchmark')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS.keys()),
+                        help='scenario to run, can be passed multiple times (default: all)')
+    parser.add_argument('--tracer', action='append', choices=list(TRACERS.keys()),
+                        help='tracer to use, can be passed multiple times (default: all)')
+    parser.add_argument('--target', action='append', choices=TARGETS,
+                        help='function to benchmark, can be passed multiple times (default: all)')
+    parser.add_argument('--memory', action='store_true',
+                        help='also measure the bytes per record which remain allocated while the records are alive')
+    args = parser.parse_args(argv)
+
+    results = [run(scenario_name=scenario_name, tracer_name=tracer_name, target=target, iterations=args.iterations,
+                   repeat=args.repeat, memory=args.memory)
+               for scenario_name in args.scenario or SCENARIOS.keys()
+               for tracer_name in args.tracer or TRACERS.keys()
+               for target in args.target or TARGETS]
+
+    json.dump({
+        'version': __version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'iterations': args.iterations,
+        'repeat': args.repeat,
+        'results': results,
+    }, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
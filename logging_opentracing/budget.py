@@ -0,0 +1,86 @@
+"""
+Estimate and limit the size of the key-value pairs which are logged to a span
+"""
+
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+#: Policy which truncates string values and drops other values which do not fit into the remaining budget
+TRUNCATE = 'truncate'
+#: Policy which drops whole logs which do not fit into the remaining budget
+DROP = 'drop'
+
+#: Suffix of truncated string values
+TRUNCATED_SUFFIX = '...'
+
+#: Maximum depth up to which the items of containers are estimated
+_MAX_DEPTH = 4
+
+
+def estimate_size(value: Any, depth: int = 0) -> int:
+    """
+    Estimate the size of a value in bytes.
+
+    Strings count with their length, numbers with 8 bytes and containers with the sum of their items. For all other
+    objects the size of the object itself without referenced objects is used.
+
+    :param value: Value
+    :param depth: Current depth of nested containers
+    :return: Estimated size in bytes
+    """
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+
+    if value is None or isinstance(value, (bool, int, float)):
+        return 8
+
+    if isinstance(value, type):
+        return len(value.__qualname__)
+
+    if depth < _MAX_DEPTH:
+        if isinstance(value, dict):
+            return sum(estimate_size(k, depth + 1) + estimate_size(v, depth + 1) for k, v in value.items())
+
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return sum(estimate_size(v, depth + 1) for v in value)
+
+    return sys.getsizeof(value)
+
+
+def apply_budget(key_values: Dict[str, Any], remaining: int, policy: str) -> Tuple[Optional[Dict[str, Any]], int]:
+    """
+    Fit key-value pairs into the remaining budget of a span
+
+    :param key_values: Key-value pairs of a log
+    :param remaining: Remaining budget of the span in bytes
+    :param policy: :data:`TRUNCATE` or :data:`DROP`
+    :return: The key-value pairs which fit into the budget or ``None`` if the whole log has been dropped, and the
+        estimated size of these key-value pairs.
+    """
+    sizes = [(key, value, estimate_size(key), estimate_size(value)) for key, value in key_values.items()]
+    size = sum(key_size + value_size for _, _, key_size, value_size in sizes)
+
+    if size <= remaining:
+        return key_values, size
+
+    if policy == DROP:
+        return None, 0
+
+    key_values_fitted = dict()
+    size = 0
+
+    for key, value, key_size, value_size in sizes:
+        if size + key_size + value_size <= remaining:
+            key_values_fitted[key] = value
+            size += key_size + value_size
+        elif isinstance(value, str):
+            length = remaining - size - key_size - len(TRUNCATED_SUFFIX)
+
+            if length > 0:
+                key_values_fitted[key] = value[:length] + TRUNCATED_SUFFIX
+                size += key_size + length + len(TRUNCATED_SUFFIX)
+
+    if not key_values_fitted:
+        return None, 0
+
+    return key_values_fitted, size
@@ -0,0 +1,146 @@
+"""
+Capture the active span when a record is created
+
+The OpenTracingHandler looks up the active span when it handles a record. When records are handled in a different
+thread, e.g. with :class:`logging.handlers.QueueHandler` and :class:`logging.handlers.QueueListener`, no span is active
+there anymore. The filter and the record factory of this module store a reference to the active span on the record in
+the thread which makes the logging call. The handler prefers this captured span over the scope manager.
+
+The span is only weakly referenced if possible, such that records do not keep finished spans alive. The reference is
+dropped when a record is pickled, e.g. to be sent to another process, where the span could not be used anyway.
+"""
+
+import logging
+from logging import LogRecord
+from typing import Callable, Optional
+import weakref
+
+from opentracing import Span, Tracer
+
+from .resolvers import CAPTURED_SPAN_ATTR, SpanResolver, scope_manager
+from .timestamps import capture_monotonic
+
+
+class _SpanReference:
+    """
+    Reference to a captured span, which is weak if the span supports weak references.
+
+    Spans cannot be passed to other processes, so the reference is pickled as ``None``, e.g. by
+    :class:`logging.handlers.SocketHandler` or a :class:`logging.handlers.QueueHandler` with a
+    :class:`multiprocessing.Queue`. Copies of a record within the process keep the reference.
+    """
+
+    __slots__ = ('_get',)
+
+    def __init__(self, span: Span):
+        try:
+            self._get = weakref.ref(span)
+        except TypeError:
+            self._get = lambda: span
+
+    def __call__(self) -> Optional[Span]:
+        return self._get()
+
+    def __reduce__(self):
+        # unpickled as None without requiring this package in the receiving process
+        return type(None), ()
+
+    def __copy__(self) -> '_SpanReference':
+        return self
+
+    def __deepcopy__(self, memo) -> '_SpanReference':
+        return self
+
+
+def capture_span(record: LogRecord, resolver: SpanResolver):
+    """
+    Store a reference to the span of a record under :data:`logging_opentracing.resolvers.CAPTURED_SPAN_ATTR`
+
+    :param record: Logging record
+    :param resolver: Span resolver which finds the span, usually :func:`logging_opentracing.resolvers.scope_manager`
+    """
+    span = resolver(record)
+
+    if span is not None:
+        setattr(record, CAPTURED_SPAN_ATTR, _SpanReference(span))
+
+
+class SpanCaptureFilter(logging.Filter):
+    """
+    Filter which captures the active span. It does not filter any records.
+
+    Add it to the logger or to the handler which runs in the thread of the logging call, e.g.
+
+    .. code-block:: python
+
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.addFilter(SpanCaptureFilter(tracer))
+        QueueListener(log_queue, OpenTracingHandler(tracer=tracer)).start()
+    """
+
+    def __init__(self, tracer: Optional[Tracer] = None, resolver: Optional[SpanResolver] = None,
+                 monotonic: bool = False):
+        """
+        :param tracer: Tracer whose active span is captured
+        :param resolver: Span resolver which is used instead of the scope manager of ``tracer``
+        :param monotonic: Also capture the monotonic time for high resolution timestamps, see
+            :func:`logging_opentracing.timestamps.high_resolution`
+        """
+        super().__init__()
+
+        if resolver is None:
+            if tracer is None:
+                raise ValueError('Either a tracer or a resolver must be provided')
+
+            resolver = scope_manager(tracer=tracer)
+
+        self._resolver = resolver
+        self._monotonic = monotonic
+
+    def filter(self, record: LogRecord) -> bool:
+        if self._monotonic:
+            capture_monotonic(record=record)
+
+        capture_span(record=record, resolver=self._resolver)
+
+        return True
+
+
+def span_capturing_record_factory(tracer: Optional[Tracer] = None, resolver: Optional[SpanResolver] = None,
+                                  factory: Optional[Callable[..., LogRecord]] = None,
+                                  monotonic: bool = False) -> Callable[..., LogRecord]:
+    """
+    Create a record factory which captures the active span of every record
+
+    .. code-block:: python
+
+        logging.setLogRecordFactory(span_capturing_record_factory(tracer))
+
+    :param tracer: Tracer whose active span is captured
+    :param resolver: Span resolver which is used instead of the scope manager of ``tracer``
+    :param factory: Record factory which creates the records. The current factory of ``logging`` is used if it is not
+        set.
+    :param monotonic: Also capture the monotonic time for high resolution timestamps, see
+        :func:`logging_opentracing.timestamps.high_resolution`
+    :return: Record factory
+    """
+    if resolver is None:
+        if tracer is None:
+            raise ValueError('Either a tracer or a resolver must be provided')
+
+        resolver = scope_manager(tracer=tracer)
+
+    if factory is None:
+        factory = logging.getLogRecordFactory()
+
+    def create(*args, **kwargs) -> LogRecord:
+        record = factory(*args, **kwargs)
+
+        if monotonic:
+            capture_monotonic(record=record)
+
+        capture_span(record=record, resolver=resolver)
+
+        return record
+
+    return create
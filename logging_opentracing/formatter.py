@@ -3,16 +3,212 @@ Formatter to provide logs in a Python dictionary format which can be used by the
 """
 
 from abc import ABC, abstractmethod
-from io import StringIO
 from logging import Formatter, LogRecord
-import sys
-import traceback
-from typing import Dict, Optional
+import re
+import reprlib
+import threading
+from typing import Any, Callable, Dict, Hashable, Mapping, NamedTuple, Optional, Tuple
+import weakref
 
 from opentracing import logs
 from opentracing.ext import tags
 
+from .asctime import AsctimeRenderer
 from .conf import default_format
+from .serializer import type_name_of
+from .stack import StackRenderer, format_exc_text
+
+#: Regular expression to find the record attributes which are referenced by a %-style format string
+_FIELD_REGEX = re.compile(r'%\(([^)]+)\)')
+#: Regular expression of templates which consist of a single directive without flags
+_SINGLE_FIELD_REGEX = re.compile(r'%\(([^)]+)\)([sdif])')
+
+#: Prefix of the keys of the arguments of structured messages
+ARGS_PREFIX = 'args.'
+
+#: Results of formatting records by formatters which share their results, such that multiple handlers which handle the
+#: same record do not repeat the work. The memos are kept outside of the records, such that the records are not changed
+#: and can still be pickled, and they are discarded together with their records.
+_MEMOS = weakref.WeakKeyDictionary()
+#: Key of the message in the memo of a record
+_MESSAGE = object()
+#: Attributes of a record from which all formatting results are derived in addition to the attributes referenced by
+#: the format. A memoized result is only used if none of these attributes has been replaced since, e.g. by a filter.
+_MEMO_SOURCE_FIELDS = ('msg', 'args', 'exc_info', 'exc_text', 'levelname', 'created')
+#: Attributes which the formatter derives from the other attributes of a record
+_DERIVED_FIELDS = frozenset(('message', 'levelname_lower', 'asctime', 'exc_text'))
+
+#: Compiled formats, renderers and memo keys which are shared by formatters with the same options. The objects are
+#: only kept while they are used by a formatter.
+_INTERNED = weakref.WeakValueDictionary()
+#: Lock to create each interned object only once
+_INTERN_LOCK = threading.Lock()
+
+
+def _intern(signature: Tuple, factory: Callable[[], Any]) -> Any:
+    """
+    Get the object which is shared by all formatters for a signature or create it
+
+    :param signature: Hashable signature of the options of the object
+    :param factory: Creates the object if there is none for this signature yet
+    :return: The shared object
+    """
+    with _INTERN_LOCK:
+        value = _INTERNED.get(signature)
+
+        if value is None:
+            value = _INTERNED[signature] = factory()
+
+        return value
+
+
+def _memo_get(memo: Optional[Dict], key: Any, source: Tuple) -> Any:
+    """
+    Get a result from the memo of a record if it has been derived from the same attributes
+
+    :param memo: Memo of the record or ``None`` if the results are not shared
+    :param key: Key of the result
+    :param source: Attributes of the record from which the result is derived
+    :return: The result or ``None`` if there is no valid result
+    """
+    if memo is None:
+        return None
+
+    entry = memo.get(key)
+
+    if entry is None:
+        return None
+
+    entry_source, result = entry
+
+    # the attributes are compared by identity, such that replaced attributes are detected cheaply
+    if len(entry_source) != len(source) or any(a is not b for a, b in zip(entry_source, source)):
+        return None
+
+    return result
+
+
+class _MemoKey:
+    """
+    Key of the formatted key-values of formatters with the same options in the memo of a record
+    """
+
+    __slots__ = ('__weakref__',)
+
+
+class _CompiledFormat:
+    """
+    A ``kv_format`` dictionary compiled into a single renderer.
+
+    All format strings are prepared once when the formatter is created. Static templates, which do not reference any
+    attribute of the record, are evaluated right away and their values are reused for every record. Templates which
+    consist of a single directive, like ``'%(message)s'``, are replaced by a direct lookup of the attribute. Rendering a
+    record is then a copy of the static values and a single pass over the remaining templates which interpolates each
+    of them directly with the attributes of the record, instead of dispatching to one :class:`logging.Formatter` per
+    key.
+    """
+
+    def __init__(self, kv_format: Dict[str, str], native_values: bool = False):
+        """
+        :param kv_format: Format as passed to :class:`OpenTracingFormatter`
+        :param native_values: Keep the types of single directive templates with the conversions ``d``, ``i`` and ``f``
+        """
+        #: Pairs of keys and %-style templates. Like :class:`logging.Formatter` an empty format falls back to the
+        #: message
+        self.templates = tuple((key, fmt or '%(message)s') for key, fmt in kv_format.items())
+        #: Names of all record attributes which are referenced by at least one template
+        self.fields = frozenset(field for _, template in self.templates
+                                for field in _FIELD_REGEX.findall(template))
+        #: Is one of the templates using time?
+        self.uses_time = 'asctime' in self.fields
+
+        converters = _NATIVE_CONVERTERS if native_values else _STR_CONVERTERS
+
+        #: All keys in the order of the format with the values of the static templates. The values of the other
+        #: templates are ``None`` and are replaced for each record, such that the order of the keys is kept.
+        self._static = dict()
+        #: Pairs of keys and templates which have to be interpolated for each record
+        self._dynamic = []
+        #: Keys, attributes and converters of the single directive templates
+        self._direct = []
+
+        for key, template in self.templates:
+            self._static[key] = template % {} if _is_static(template) else None
+
+            match = _SINGLE_FIELD_REGEX.fullmatch(template)
+            convert = converters.get(match.group(2)) if match is not None else None
+
+            if convert is not None:
+                self._direct.append((key, match.group(1), convert))
+            elif not _is_static(template):
+                self._dynamic.append((key, template))
+
+        self._dynamic = tuple(self._dynamic)
+        self._direct = tuple(self._direct)
+        #: Do all templates have to be interpolated?
+        self._only_dynamic = len(self._dynamic) == len(self.templates)
+
+    def render(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Render all templates
+
+        :param values: Attributes of the record, usually ``record.__dict__``
+        :return: A dictionary containing the key-value pairs for the log
+        """
+        try:
+            if self._only_dynamic:
+                return {key: template % values for key, template in self._dynamic}
+
+            key_values = self._static.copy()
+
+            for key, template in self._dynamic:
+                key_values[key] = template % values
+
+            for key, field, convert in self._direct:
+                key_values[key] = convert(values[field])
+
+            return key_values
+        except KeyError as e:
+            # same error as raised by logging.Formatter
+            raise ValueError(f'Formatting field not found in record: {e}')
+
+
+def _to_str(value: Any) -> str:
+    """
+    Convert a value like the directive ``%s``
+    """
+    return value if type(value) is str else str(value)
+
+
+#: Converters of single directive templates which render strings
+_STR_CONVERTERS = {'s': _to_str}
+#: Converters of single directive templates which keep numbers as native types
+_NATIVE_CONVERTERS = {'s': _to_str, 'd': int, 'i': int, 'f': float}
+
+
+def _is_static(template: str) -> bool:
+    """
+    Check if a %-style template contains no directives except of escaped percent signs
+
+    :param template: Template
+    :return: Whether the template renders to the same value for every record
+    """
+    return '%' not in template.replace('%%', '')
+
+
+class ExceptionSnapshot(NamedTuple):
+    """
+    Compact and immutable snapshot of an exception which does not keep the traceback and its frames alive
+    """
+
+    #: Qualified name of the type of the exception
+    type_name: str
+    #: Message of the exception, i.e. ``str(exception)``
+    message: str
+    #: Size-bounded representation of the arguments of the exception
+    args_repr: str
+    #: Rendered stack of the exception
+    stack: Optional[str]
 
 
 class OpenTracingFormatterABC(ABC):
@@ -32,13 +228,29 @@ class OpenTracingFormatterABC(ABC):
         """
         pass
 
+    def prepare(self, record: LogRecord):
+        """
+        Prepare a copy of a record which is formatted later in another thread, e.g. by an asynchronous
+        :class:`logging_opentracing.handler.OpenTracingHandler`. Like :meth:`logging.handlers.QueueHandler.prepare`,
+        the message is interpolated right away and the arguments are removed, such that changes of mutable arguments
+        after the logging call are not logged.
+
+        :param record: Copy of the record which can be changed
+        """
+        record.msg = record.getMessage()
+        record.args = None
+
 
 class OpenTracingFormatter(OpenTracingFormatterABC):
     """
     Formatter to prepare key-value pairs for OpenTracing logging
     """
 
-    def __init__(self, kv_format: Optional[Dict[str, str]] = None, date_format: Optional[str] = None):
+    def __init__(self, kv_format: Optional[Dict[str, str]] = None, date_format: Optional[str] = None,
+                 stack_cache_size: int = 128, stack_source_lines: bool = True, stack_max_frames: Optional[int] = None,
+                 stack_max_length: Optional[int] = None, exception_snapshot: bool = False,
+                 structured_message: bool = False, native_values: bool = False, mutate_record: bool = True,
+                 share_results: bool = False):
         """
         Prepare and define the format which should be used for the OpenTracing logs
 
@@ -52,6 +264,36 @@ class OpenTracingFormatter(OpenTracingFormatterABC):
             ``tracer.scope_manager.active.span.log_kv({'event': 'warning', 'message': 'Hello World'})``
         :param date_format: Date format which should be used. This parameter will be propagated to the parameter
             ``datefmt`` of :meth:`logging.Formatter`.
+        :param stack_cache_size: Maximum number of rendered stacks of exceptions which are cached. Exceptions which
+            have been raised at the same code locations reuse the cached stack. The cache is disabled with ``0``.
+        :param stack_source_lines: Render the source line of each frame of the stacks. When it is disabled, no source
+            files are read while logging exceptions.
+        :param stack_max_frames: Maximum number of frames of the stacks. The outermost and the innermost frames are
+            kept.
+        :param stack_max_length: Maximum length of the stacks in characters. Stacks which are bounded by this option,
+            ``stack_source_lines`` or ``stack_max_frames`` are only logged to the spans. ``exc_text`` of the records
+            is not changed to the bounded text.
+        :param exception_snapshot: Log an :class:`ExceptionSnapshot` under the key ``error.object`` and the qualified
+            name of the exception type under ``error.kind`` instead of the exception and its type. The logs then do
+            not keep the traceback and the local variables of its frames alive until the tracer reports the span.
+        :param structured_message: Do not interpolate the arguments of the records into their messages. ``message`` is
+            the unchanged message template, e.g. ``'User %s logged in'``, and the arguments are logged with their
+            original types as separate key-values ``args.0``, ``args.1``, ... or ``args.<key>`` if the arguments are a
+            mapping. This saves the interpolation and logs with the same template can be grouped by the backend.
+        :param native_values: Log the values of formats which consist of a single directive with the conversion ``d``
+            or ``i`` as ``int`` and with the conversion ``f`` as ``float`` instead of strings, e.g. ``'%(lineno)d'``
+            is logged as ``42`` instead of ``'42'``.
+        :param mutate_record: Store the derived attributes ``message``, ``levelname_lower``, ``asctime`` and
+            ``exc_text`` on the record, like :class:`logging.Formatter` stores some of them. If it is disabled, the
+            derived attributes are only computed when the format references them and the record is not changed, such
+            that other handlers see the record as it has been created.
+        :param share_results: Keep the results of formatting a record while the record is alive and share them with
+            other formatters which share their results, e.g. of other handlers of the same logger. Formatters of the
+            same class with the same options share the formatted key-values, others still share the message and the
+            stack. Subclasses whose key-values depend on other attributes of the instance must return them from
+            :meth:`share_key`. A result is only reused if the attributes of the record from which it has been derived
+            have not been replaced in the meantime, e.g. by the filter of a handler. Changes inside of mutable
+            attributes, e.g. of a list in ``args``, are not detected.
         """
         # use the default format if no format has been provided
         if kv_format is None:
@@ -59,51 +301,108 @@ class OpenTracingFormatter(OpenTracingFormatterABC):
 
         #: Date format to be used in the logs
         self._date_format = date_format
-        #: Key-value pairs for formatting.
-        #: Keys are the keys which will be used in the logs and the values are the formatters which are used to format
+        #: Formatter which is used to format exceptions
+        self._formatter = Formatter(datefmt=date_format)
+        #: Renderer for the time of the records which caches the rendered seconds
+        self._asctime_renderer = _intern(('asctime', date_format), lambda: AsctimeRenderer(date_format=date_format))
+        #: The compiled ``kv_format``.
+        #: Keys are the keys which will be used in the logs and the values are the templates which are used to format
         #: the corresponding values in the logs.
-        self._formatters = self._create_formatters(kv_format=kv_format)
-        #: Is one of the formatters using time?
-        self._uses_time = any([f.usesTime() for f in self._formatters.values()])
+        self._compiled = _intern(('format', tuple(kv_format.items()), native_values),
+                                 lambda: _CompiledFormat(kv_format=kv_format, native_values=native_values))
+        #: Renderer for the stacks of exceptions. Formatters with the same stack options share the renderer and its
+        #: cache
+        self._stack_renderer = _intern(
+            ('stack', stack_cache_size, stack_source_lines, stack_max_frames, stack_max_length),
+            lambda: StackRenderer(cache_size=stack_cache_size, source_lines=stack_source_lines,
+                                  max_frames=stack_max_frames, max_length=stack_max_length))
+        self._exception_snapshot = exception_snapshot
+        self._structured_message = structured_message
+        self._mutate_record = mutate_record
+        #: Attributes of the record which are referenced by the format and which are not derived by the formatter
+        self._record_fields = tuple(self._compiled.fields - _DERIVED_FIELDS)
+        self._share_results = share_results
+        #: Attributes of the record from which the formatted key-values are derived
+        self._memo_fields = _MEMO_SOURCE_FIELDS + tuple(field for field in self._record_fields
+                                                        if field not in _MEMO_SOURCE_FIELDS)
+        #: Options which determine the formatted key-values together with the class and :meth:`share_key`
+        self._memo_signature = ('memo', type(self), self._compiled, self._stack_renderer, date_format,
+                                exception_snapshot, structured_message)
+        #: Key of the formatted key-values in the memo of the records. Formatters of the same class with the same
+        #: options and share keys produce the same key-values and share the key. It is created when it is first used.
+        self._memo_key = None
 
-    def _create_formatters(self, kv_format: Dict[str, str]) -> Dict[str, Formatter]:
-        """
-        Initialize the formatters
+    def share_key(self) -> Hashable:
         """
-        kwargs = {'datefmt': self._date_format}
+        Get the part of the key of shared results which depends on the instance. Formatters only share their
+        formatted key-values if they are of the same class, have the same options and return equal share keys.
 
-        # for Python versions >= 3.8 the format should not be validated because it should also be possible to have
-        # static format strings (without any % directive like "%(levelname)s"). This would not be possible with
-        # "validate=True"
-        if (sys.version_info[0] == 3 and sys.version_info[1] >= 8) or sys.version_info[0] > 3:
-            kwargs['validate'] = False
+        Subclasses whose key-values depend on attributes of the instance besides the options of
+        :class:`OpenTracingFormatter` must return these attributes. The share key is requested once, when the formatter
+        shares its results for the first time.
 
-        return {key: Formatter(fmt=fmt, **kwargs) for key, fmt in kv_format.items()}
+        :return: Hashable value, ``None`` per default
+        """
+        return None
+
+    def prepare(self, record: LogRecord):
+        # structured messages log the template and the arguments themselves, which are not interpolated
+        if not self._structured_message:
+            super().prepare(record)
 
-    def _format_message(self, record: LogRecord) -> Dict[str, str]:
+    def _format_message(self, record: LogRecord, values: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
         """
-        Use the formatters ``self.formatters`` to format the key-value pairs for the log.
+        Use the compiled format ``self._compiled`` to format the key-value pairs for the log.
 
         :param record: Logging record
+        :param values: Values which are used instead of the attributes of the record
         :return: A dictionary containing the key-value pairs for the log
         """
-        return {key: formatter.formatMessage(record=record) for key, formatter in self._formatters.items()}
+        return self._compiled.render(values=values if values is not None else record.__dict__)
 
     @staticmethod
-    def _format_exception(record: LogRecord) -> Dict[str, str]:
+    def _format_args(record: LogRecord) -> Dict[str, Any]:
+        """
+        Log the arguments of a record as separate key-value pairs for structured messages
+
+        :param record: Logging record
+        :return: A dictionary containing a key-value pair for each argument
+        """
+        args = record.args
+
+        if not args:
+            return dict()
+
+        if isinstance(args, Mapping):
+            return {f'{ARGS_PREFIX}{key}': value for key, value in args.items()}
+
+        return {f'{ARGS_PREFIX}{i}': value for i, value in enumerate(args)}
+
+    def _format_exception(self, record: LogRecord, stack: Optional[str]) -> Dict[str, str]:
         """
         Format an exception OpenTracing uses when formatting uncaught exceptions
+
+        :param record: Logging record
+        :param stack: Rendered stack of the exception of the record
         """
         exc_info = record.exc_info
         # is an exception attached to the log
         if record.exc_info:
-            exc_type, exc_val, exc_tb = exc_info
+            exc_type, exc_val, _ = exc_info
+
+            if self._exception_snapshot:
+                message = str(exc_val)
+                type_name = type_name_of(exc_type)
 
-            # catch the output of print_tb()
-            sio = StringIO()
-            traceback.print_tb(exc_tb, file=sio)
-            exc_tb = sio.getvalue()
-            sio.close()
+                return {
+                    logs.EVENT: tags.ERROR,
+                    logs.MESSAGE: message,
+                    logs.ERROR_OBJECT: ExceptionSnapshot(type_name=type_name, message=message,
+                                                         args_repr=reprlib.repr(getattr(exc_val, 'args', ())),
+                                                         stack=stack),
+                    logs.ERROR_KIND: type_name,
+                    logs.STACK: stack,
+                }
 
             # format which is also used by OpenTracing
             return {
@@ -111,33 +410,153 @@ class OpenTracingFormatter(OpenTracingFormatterABC):
                 logs.MESSAGE: str(exc_val),
                 logs.ERROR_OBJECT: exc_val,
                 logs.ERROR_KIND: exc_type,
-                logs.STACK: exc_tb,
+                logs.STACK: stack,
             }
         else:
             return dict()
 
+    def _message(self, record: LogRecord, memo: Optional[Dict]) -> str:
+        """
+        Get the message of a record from the memo of the record or create it
+
+        :param record: Logging record
+        :param memo: Memo of the record or ``None`` if the results are not shared
+        :return: The message
+        """
+        if self._structured_message:
+            return str(record.msg)
+
+        source = (record.msg, record.args)
+        message = _memo_get(memo=memo, key=_MESSAGE, source=source)
+
+        if message is None:
+            message = record.getMessage()
+
+            if memo is not None:
+                memo[_MESSAGE] = (source, message)
+
+        return message
+
+    def _exc_text(self, record: LogRecord, stack: str) -> str:
+        """
+        Get the exception text of a record like :meth:`logging.Formatter.formatException` for the log.
+
+        With bounded stacks, the text contains the bounded stack and differs from ``exc_text`` of the record.
+
+        :param record: Logging record with exception information
+        :param stack: Rendered stack of the exception
+        :return: The exception text
+        """
+        if record.exc_text and not self._stack_renderer.bounded:
+            return record.exc_text
+
+        return format_exc_text(exc_info=record.exc_info, stack=stack) or \
+            self._formatter.formatException(record.exc_info)
+
+    def _view(self, record: LogRecord, memo: Optional[Dict], stack: Optional[str]) -> Dict[str, Any]:
+        """
+        Collect the attributes of a record which are referenced by the format together with the derived attributes,
+        without changing the record
+
+        :param record: Logging record
+        :param memo: Memo of the record or ``None`` if the results are not shared
+        :param stack: Rendered stack of the exception of the record
+        :return: Values for the compiled format
+        """
+        values = record.__dict__
+        fields = self._compiled.fields
+        # attributes which are missing are left out, such that the compiled format raises the same error as logging
+        view = {field: values[field] for field in self._record_fields if field in values}
+
+        if 'message' in fields:
+            view['message'] = self._message(record=record, memo=memo)
+        if 'levelname_lower' in fields:
+            view['levelname_lower'] = record.levelname.lower()
+        if self._compiled.uses_time:
+            view['asctime'] = self._asctime_renderer.render(record=record)
+        if 'exc_text' in fields:
+            view['exc_text'] = self._exc_text(record=record, stack=stack) if record.exc_info else record.exc_text
+
+        return view
+
     def format(self, record: LogRecord) -> Dict[str, str]:
-        record.message = record.getMessage()
-        record.levelname_lower = record.levelname.lower()
+        memo = None
+
+        if self._share_results:
+            memo = _MEMOS.get(record)
+
+            if memo is None:
+                memo = _MEMOS[record] = dict()
 
-        # in the case that no formatter have been provided return an empty dictionary
-        if len(self._formatters) == 0:
+            if self._memo_key is None:
+                self._memo_key = _intern(self._memo_signature + (self.share_key(),), _MemoKey)
+
+            values = record.__dict__
+            source = tuple(values.get(field) for field in self._memo_fields)
+            key_values = _memo_get(memo=memo, key=self._memo_key, source=source)
+
+            # the record has already been formatted by a formatter with the same options, e.g. of another handler
+            if key_values is not None:
+                return dict(key_values)
+
+        if self._mutate_record:
+            record.message = self._message(record=record, memo=memo)
+            record.levelname_lower = record.levelname.lower()
+
+        # in the case that no format has been provided return an empty dictionary
+        if len(self._compiled.templates) == 0:
             return dict()
 
-        # use one of the formatter to set some attribute in the record
-        formatter = self._formatters[list(self._formatters.keys())[0]]
+        if self._mutate_record and self._compiled.uses_time:
+            record.asctime = self._asctime_renderer.render(record=record)
+
+        stack = None
 
-        if self._uses_time:
-            record.asctime = formatter.formatTime(record=record)
         if record.exc_info:
-            # Cache the traceback text to avoid converting it multiple times
-            # (it's constant anyway)
-            if not record.exc_text:
-                record.exc_text = formatter.formatException(record.exc_info)
+            # the stack is rendered once and shared by the stack of the log, the exception text and all formatters with
+            # the same stack options
+            stack = _memo_get(memo=memo, key=self._stack_renderer, source=record.exc_info)
+
+            if stack is None:
+                stack = self._stack_renderer.render(tb=record.exc_info[2])
+
+                if memo is not None:
+                    memo[self._stack_renderer] = (record.exc_info, stack)
+
+        values = None
 
-        key_values_message = self._format_message(record=record)
-        key_values_exception = self._format_exception(record=record)
+        if self._mutate_record:
+            if record.exc_info and 'exc_text' in self._compiled.fields:
+                if self._stack_renderer.bounded:
+                    # the bounded text is only logged, other handlers still get the full text from the record
+                    values = {**record.__dict__, 'exc_text': self._exc_text(record=record, stack=stack)}
+                elif not record.exc_text:
+                    # Cache the traceback text to avoid converting it multiple times
+                    # (it's constant anyway). It is only needed when the format uses it
+                    record.exc_text = self._exc_text(record=record, stack=stack)
+
+            key_values_message = self._format_message(record=record, values=values)
+        else:
+            key_values_message = self._format_message(record=record,
+                                                      values=self._view(record=record, memo=memo, stack=stack))
+
+        key_values_exception = self._format_exception(record=record, stack=stack)
 
         # merge the key-values of the message and the exception such that the message key-values overwrite the
         # exception key-values incase of duplicates
-        return {**key_values_exception, **key_values_message}
+        key_values = {**key_values_exception, **key_values_message}
+
+        if self._structured_message:
+            # the arguments are appended but never overwrite formatted key-values
+            for key, value in self._format_args(record=record).items():
+                key_values.setdefault(key, value)
+
+        if memo is None:
+            return key_values
+
+        # attributes like exc_text may have been set while formatting
+        values = record.__dict__
+        memo[self._memo_key] = (tuple(values.get(field) for field in self._memo_fields), key_values)
+
+        # the handler extends the key-values and must not change the memo
+        return dict(key_values)
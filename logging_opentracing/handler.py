@@ -2,18 +2,38 @@
 An OpenTracing handler for the Python logging package
 """
 
-from logging import Handler, LogRecord, NOTSET
-from typing import Optional, Union
+from collections import deque
+from logging import ERROR, INFO, Handler, LogRecord, NOTSET, getLevelName
+import os
+import threading
+import time
+from time import perf_counter
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence, Tuple, Union
+import weakref
 
-from opentracing import Span, Tracer
+from opentracing import Span, Tracer, logs
 from opentracing.ext import tags
 
+from . import budget, resolvers, timestamps
 from .formatter import OpenTracingFormatterABC, OpenTracingFormatter
+from .serializer import ValueSerializer
+from .span_state import SpanState, SpanStateRegistry, TokenBucket
+from .stats import ThreadStats
+
+#: Item which is put into the queue of an asynchronous handler to stop its worker
+_STOP = object()
 
 
 class OpenTracingHandler(Handler):
     def __init__(self, tracer: Tracer, formatter: Optional[OpenTracingFormatterABC] = None, span_key: str = 'span',
-                 extra_kv_key: str = 'kv', level: Union[str, int] = NOTSET):
+                 extra_kv_key: str = 'kv', level: Union[str, int] = NOTSET, asynchronous: bool = False,
+                 queue_size: int = 10000, batch_size: Optional[int] = None, batch_max_age: Optional[float] = None,
+                 sampled_check: Optional[Callable[[Span], bool]] = None, tail_buffer_size: Optional[int] = None,
+                 tail_buffer_level: int = INFO, rate_limits: Optional[Dict[int, Tuple[float, float]]] = None,
+                 max_span_bytes: Optional[int] = None, budget_policy: str = budget.TRUNCATE,
+                 span_resolvers: Optional[Sequence[resolvers.SpanResolver]] = None, lock_free: bool = False,
+                 serializer: Optional[ValueSerializer] = None,
+                 timestamp_source: timestamps.TimestampSource = timestamps.record_created):
         """
         Initialize the logging handler for OpenTracing
 
@@ -41,38 +61,252 @@ class OpenTracingHandler(Handler):
 
                 logger.info('A span has been directly passed', extra={extra_kv_key: {'key 1': 'value 1', 'key 2': 2}})
         :param level: Logging level
+        :param asynchronous: If set, :meth:`emit` only resolves the span and puts a snapshot of the record into a
+            bounded queue. The message of the snapshot is interpolated with :meth:`OpenTracingFormatterABC.prepare`
+            right away, the remaining formatting and :func:`opentracing.span.log_kv` are done by a background thread.
+            The logs keep the creation time of the records as timestamps.
+
+            Before a span finishes, it waits until all of its queued records have been logged. :meth:`flush` waits
+            until the whole queue has been processed and :meth:`close` additionally stops the background thread.
+            Both are called by :func:`logging.shutdown` when the interpreter exits.
+        :param queue_size: Maximum number of records in the queue of an asynchronous handler. When the queue is full,
+            logging calls block until the background thread has caught up.
+        :param batch_size: If set, the logs are buffered for each span and written to the span when the buffer
+            contains ``batch_size`` logs, when the span finishes or when the handler is flushed. The logs keep the
+            creation time of the records as timestamps. Each log is still written with its own call of
+            :func:`opentracing.span.log_kv`, so the number of calls is not reduced.
+        :param batch_max_age: If set, the logs are buffered like for ``batch_size`` and the buffer is written to the
+            span as soon as a new log is at least ``batch_max_age`` seconds younger than the oldest buffered log.
+        :param sampled_check: Callable which gets a span and returns if it is sampled. Records of spans which are not
+            sampled are dropped before they are formatted. The result is cached for each span. The module
+            :mod:`logging_opentracing.sampling` provides checks for the span context and the tag ``sampling.priority``
+            but any callable can be used.
+
+            .. code-block:: python
+
+                from logging_opentracing.sampling import context_sampled
+
+                handler = OpenTracingHandler(tracer=tracer, sampled_check=context_sampled)
+        :param tail_buffer_size: If set, records with a level up to ``tail_buffer_level`` are not logged right away but
+            kept in a ring buffer of this size for each span. The buffer is only logged, when a record with the level
+            ``ERROR`` or higher or with exception information arrives for the span. Afterwards, all records of the span
+            are logged right away. Otherwise, the buffer is discarded when the span finishes.
+        :param tail_buffer_level: Highest level of the records which are kept in the ring buffer
+        :param rate_limits: Limit the number of records per span for logging levels. The keys are the levels and the
+            values are pairs of the number of records per second and the burst size of a token bucket. Records above
+            the limit are dropped before they are formatted. When the span finishes, a summary log reports how many
+            records have been suppressed for each level.
+
+            E.g. at most 10 ``DEBUG`` records per second with bursts of up to 100 records:
+
+            .. code-block:: python
+
+                handler = OpenTracingHandler(tracer=tracer, rate_limits={logging.DEBUG: (10, 100)})
+        :param max_span_bytes: Budget in bytes for the key-value pairs which are logged to a span. The size of each log,
+            including additional key-values and the stack of exceptions, is estimated with
+            :func:`logging_opentracing.budget.estimate_size`. Logs which exceed the remaining budget are handled with
+            ``budget_policy``. When the span finishes, the summary log reports how many logs have been dropped and
+            truncated.
+        :param budget_policy: Either :data:`logging_opentracing.budget.TRUNCATE` (``'truncate'``), which truncates
+            string values and drops other values that do not fit into the remaining budget, or
+            :data:`logging_opentracing.budget.DROP` (``'drop'``), which drops the whole log.
+        :param span_resolvers: Span resolvers which are tried in this order to find the span of a record. They are
+            combined into a single callable when the handler is created. If they are not set, the span passed under
+            ``span_key``, the span captured when the record was created (see :mod:`logging_opentracing.capture`) and
+            then the active span of the scope manager of the tracer are used. The module
+            :mod:`logging_opentracing.resolvers` provides resolvers for record attributes, context variables and scope
+            managers but any callable which gets a record and returns a span or ``None`` can be used.
+
+            E.g. for asyncio applications which keep the current span in a context variable:
+
+            .. code-block:: python
+
+                from logging_opentracing import resolvers
+
+                handler = OpenTracingHandler(tracer=tracer, span_resolvers=[
+                    resolvers.record_attribute('span'),
+                    resolvers.context_var(current_span),
+                ])
+        :param lock_free: If set, :meth:`handle` does not acquire the lock of the handler around :meth:`emit`, such
+            that threads which log at the same time are not serialized by this handler. The state of each span is
+            synchronized by its own lock and the statistics are kept for each thread. The tracer must allow calling
+            :func:`opentracing.span.log_kv` of a span from multiple threads, which is the case e.g. for the
+            ``MockTracer`` and Jaeger.
+        :param serializer: If set, the values of the formatted key-value pairs and of the additional key-value pairs are
+            converted with this :class:`logging_opentracing.serializer.ValueSerializer` before the budget is applied
+            and they are logged, such that the tracer gets predictable values. Otherwise, the values are passed
+            unchanged to :func:`opentracing.span.log_kv`.
+        :param timestamp_source: Function which gets a record and returns the timestamp of its log. Per default the
+            creation time of the record is used, such that deferred and batched logs keep the time of the logging call.
+            :func:`logging_opentracing.timestamps.high_resolution` uses the monotonic time which has been captured when
+            the record was created, see :mod:`logging_opentracing.timestamps`. If the function returns ``None``, the
+            tracer uses the current time.
         """
         super().__init__(level=level)
 
         self._tracer = tracer
         self._span_key = span_key
+        self._lock_free = lock_free
+
+        #: Are the spans resolved with the default resolvers? Only then :meth:`_may_log` can predict the span
+        self._default_resolvers = span_resolvers is None
+
+        if span_resolvers is None:
+            span_resolvers = [resolvers.record_attribute(key=span_key), resolvers.captured_span(),
+                              resolvers.scope_manager(tracer=tracer)]
+
+        #: Single callable which resolves the span of a record
+        self._resolve_span = resolvers.chain(resolvers=span_resolvers)
         self._extra_kv_key = extra_kv_key
         self.setFormatter(formatter if formatter is not None else OpenTracingFormatter())
 
+        self._batch_size = batch_size
+        self._batch_max_age = batch_max_age
+        #: Are logs buffered per span?
+        self._batching = batch_size is not None or batch_max_age is not None
+        self._sampled_check = sampled_check
+        self._tail_buffer_size = tail_buffer_size
+        self._tail_buffer_level = tail_buffer_level
+        self._rate_limits = rate_limits
+
+        if budget_policy not in (budget.TRUNCATE, budget.DROP):
+            raise ValueError(f'Unknown budget policy "{budget_policy}"')
+
+        self._max_span_bytes = max_span_bytes
+        self._budget_policy = budget_policy
+        self._serializer = serializer
+        self._timestamp_source = timestamp_source
+
+        #: Internal statistics which are exposed with :meth:`stats`. They are kept for each thread, such that they can
+        #: be updated without holding the lock of the handler
+        self._stats = ThreadStats()
+
+        #: States of the spans to which this handler logs
+        self._span_states = SpanStateRegistry(on_finish=self._on_span_finish)
+
+        #: Queue of asynchronous handlers which contains the spans and records which should be logged
+        self._queue = None
+
+        if asynchronous:
+            # the queue module is only needed for asynchronous handlers and therefore not imported with the package
+            from queue import Queue
+            self._queue = Queue(maxsize=queue_size)
+        #: Background thread of asynchronous handlers. It is started with the first record
+        self._worker = None
+        #: Lock to start the background thread only once
+        self._worker_lock = threading.Lock()
+
+        if asynchronous and hasattr(os, 'register_at_fork'):
+            # the background thread does not exist in a forked child process and must be started again
+            handler_ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: OpenTracingHandler._reset_after_fork(handler_ref()))
+
+    @staticmethod
+    def _reset_after_fork(handler: Optional['OpenTracingHandler']):
+        """
+        Reset the background thread, the queue and the states of the spans of a handler in a forked child process.
+
+        The locks of the copied queue and states could be held by threads which do not exist in the child and the
+        queued and buffered records are logged by the parent process.
+        """
+        if handler is None:
+            return
+
+        handler._worker = None
+        handler._worker_lock = threading.Lock()
+        handler._queue = handler._queue.__class__(maxsize=handler._queue.maxsize)
+        handler._span_states.reset()
+
     def _get_span(self, record: LogRecord) -> Optional[Span]:
         """
-        Try to get the current span.
+        Try to get the current span with the span resolvers.
+
+        Per default,
 
         1. Check if the record provides a span
-        2. If the span does not contain a span try to get the span with the ScopeManager
+        2. Check if a span has been captured when the record was created
+        3. If the span does not contain a span try to get the span with the ScopeManager
 
         In the case that no span can be retrieved, return ``None``.
 
         :param record: Logging record
         :return: Span if it was retrievable, otherwise, ``None``.
         """
-        # has a Span been provided in the record
-        span = getattr(record, self._span_key) if hasattr(record, self._span_key) else None
+        return self._resolve_span(record)
 
-        # try to get an active span from the ScopeManager
-        if span is None:
-            scope = self._tracer.scope_manager.active
+    def _may_log(self, extra: Optional[Mapping[str, Any]]) -> bool:
+        """
+        Check before a record is created whether a logging call could be logged to a span. This is used by
+        :class:`logging_opentracing.logger.SpanAwareLogger` to skip creating records which would be dropped anyway.
+
+        The check is conservative: it only returns ``False`` if the default span resolvers are used, the handler has no
+        filters which could add a span to the record, no span is passed with ``extra`` and no span is active.
+
+        :param extra: The parameter ``extra`` of the logging call
+        :return: Whether the record could be logged to a span
+        """
+        if not self._default_resolvers or self.filters:
+            return True
+
+        if extra and (self._span_key in extra or resolvers.CAPTURED_SPAN_ATTR in extra):
+            return True
+
+        return self._tracer.scope_manager.active is not None
+
+    def handle(self, record: LogRecord):
+        """
+        Filter and emit the record. Unless the handler is lock free, the lock of the handler is acquired around
+        :meth:`emit`.
+
+        :param record: Logging record
+        :return: The result of the filters
+        """
+        if not self._lock_free:
+            return super().handle(record)
 
-            # a scope must be active, otherwise the log cannot be sent to OpenTracing
-            if scope is not None:
-                span = scope.span
+        rv = self.filter(record)
 
-        return span
+        # since Python 3.12 filters can return a modified record
+        if isinstance(rv, LogRecord):
+            record = rv
+
+        if rv:
+            self.emit(record)
+
+        return rv
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        Get the internal statistics of the handler.
+
+        The counters are ``records_seen``, ``records_dropped_no_span``, ``records_dropped_unsampled``,
+        ``records_dropped_rate_limit``, ``records_dropped_budget``, ``records_formatted``, ``exceptions_rendered`` and
+        ``extra_kv_type_errors``. ``time_span_lookup``, ``time_format`` and ``time_log_kv`` are the cumulative times in
+        seconds spent in resolving spans, formatting records and :func:`opentracing.span.log_kv`.
+
+        :return: Counters and timings with their names as keys
+        """
+        return self._stats.as_dict()
+
+    def _check_extra_kv(self, record: LogRecord) -> Optional[Dict]:
+        """
+        Get the key-value pairs which have been passed with the key ``self._extra_kv_key`` to the ``extra`` parameter
+        of a logging call.
+
+        :param record: Logging record
+        :return: The additional key-value pairs or ``None`` if they have not been passed
+        """
+        if not hasattr(record, self._extra_kv_key):
+            return None
+
+        key_values_extra = getattr(record, self._extra_kv_key)
+
+        if not isinstance(key_values_extra, dict):
+            self._stats.get().extra_kv_type_errors += 1
+            raise TypeError(f'A dict is expected when passing a key-value pair with the key "{self._extra_kv_key}"'
+                            f' to the "extra" parameter of a logging call')
+
+        return key_values_extra
 
     def emit(self, record: LogRecord):
         """
@@ -80,28 +314,364 @@ class OpenTracingHandler(Handler):
 
         :param record: Logging record
         """
+        stats = self._stats.get()
+        stats.records_seen += 1
+
+        start = perf_counter()
         span = self._get_span(record=record)
+        stats.time_span_lookup += perf_counter() - start
 
         if span is None:
+            stats.records_dropped_no_span += 1
             return
 
+        # the tracer would throw away the logs of spans which are not sampled
+        if self._sampled_check is not None and not self._is_sampled(span=span):
+            stats.records_dropped_unsampled += 1
+            return
+
+        if self._rate_limits is not None and not self._within_rate_limit(span=span, record=record):
+            stats.records_dropped_rate_limit += 1
+            return
+
+        if self._queue is not None:
+            self._enqueue(span=span, record=record)
+        else:
+            self._emit_to_span(span=span, record=record)
+
+    def _is_sampled(self, span: Span) -> bool:
+        """
+        Check if a span is sampled with ``self._sampled_check`` and cache the result in the state of the span
+
+        :param span: Span
+        :return: ``True`` if the span is sampled
+        """
+        state = self._span_states.get(span)
+
+        if state is None:
+            return self._sampled_check(span)
+
+        if state.sampled is None:
+            state.sampled = bool(self._sampled_check(span))
+
+        return state.sampled
+
+    def _within_rate_limit(self, span: Span, record: LogRecord) -> bool:
+        """
+        Take a token out of the token bucket of the span for the level of the record
+
+        :param span: Span
+        :param record: Logging record
+        :return: ``True`` if the record should be logged and ``False`` if it has to be suppressed
+        """
+        limit = self._rate_limits.get(record.levelno)
+
+        if limit is None:
+            return True
+
+        state = self._span_states.get(span)
+
+        if state is None:
+            return True
+
+        now = time.monotonic()
+
+        with state.condition:
+            bucket = state.buckets.get(record.levelno)
+
+            if bucket is None:
+                bucket = state.buckets[record.levelno] = TokenBucket(rate=limit[0], burst=limit[1], now=now)
+
+            if bucket.consume(now=now):
+                return True
+
+            state.suppressed[record.levelno] = state.suppressed.get(record.levelno, 0) + 1
+
+        return False
+
+    def _emit_to_span(self, span: Span, record: LogRecord):
+        """
+        Log the record in the span or keep it in the ring buffer of the span
+
+        :param span: Span to which the record should be logged
+        :param record: Logging record
+        """
+        if self._tail_buffer_size is not None:
+            state = self._span_states.get(span)
+
+            if state is not None:
+                with state.condition:
+                    if not state.tail_triggered:
+                        if record.levelno <= self._tail_buffer_level and not record.exc_info:
+                            if state.tail_buffer is None:
+                                state.tail_buffer = deque(maxlen=self._tail_buffer_size)
+
+                            state.tail_buffer.append(record)
+                            return
+
+                        if record.levelno >= ERROR or record.exc_info:
+                            # the span failed: log the buffered context and all following records right away
+                            state.tail_triggered = True
+
+                            for record_buffered in state.tail_buffer or ():
+                                self._log_record(span=span, record=record_buffered)
+
+                            state.tail_buffer = None
+
+        self._log_record(span=span, record=record)
+
+    def _log_record(self, span: Span, record: LogRecord):
+        """
+        Format the record and log it in the span with the timestamp of ``timestamp_source``
+
+        :param span: Span to which the record should be logged
+        :param record: Logging record
+        """
+        stats = self._stats.get()
+
+        start = perf_counter()
         key_values = self.format(record=record)
+        stats.time_format += perf_counter() - start
+        stats.records_formatted += 1
 
         # in the case of an exception, add an error tag of the span
         if record.exc_info:
+            stats.exceptions_rendered += 1
             span.set_tag(tags.ERROR, True)
 
         # check if a key-value pair with the key self._extra_kv_key has been passed to the extra parameter of a logging
         # call
-        if hasattr(record, self._extra_kv_key):
-            key_values_extra = getattr(record, self._extra_kv_key)
-
-            if not isinstance(key_values_extra, dict):
-                raise TypeError(f'A dict is expected when passing a key-value pair with the key "{self._extra_kv_key}"'
-                                f' to the "extra" parameter of a logging call')
+        key_values_extra = self._check_extra_kv(record=record)
 
-            # convert the values to strings and update the key-value pairs
+        if key_values_extra is not None:
             key_values.update(key_values_extra)
 
+        if self._serializer is not None:
+            key_values = self._serializer.serialize_kv(key_values=key_values)
+
+        if self._max_span_bytes is not None:
+            key_values = self._apply_budget(span=span, key_values=key_values)
+
+            if key_values is None:
+                stats.records_dropped_budget += 1
+                return
+
+        timestamp = self._timestamp_source(record)
+
         # log the key-values pairs in the span
-        span.log_kv(key_values)
+        if self._batching:
+            self._log_batched(span=span, key_values=key_values,
+                              timestamp=timestamp if timestamp is not None else record.created)
+        else:
+            start = perf_counter()
+            span.log_kv(key_values, timestamp)
+            stats.time_log_kv += perf_counter() - start
+
+    def _apply_budget(self, span: Span, key_values: Dict) -> Optional[Dict]:
+        """
+        Fit the key-value pairs of a log into the remaining budget of the span
+
+        :param span: Span to which the log belongs
+        :param key_values: Key-value pairs of the log
+        :return: The key-value pairs which should be logged or ``None`` if the log has to be dropped
+        """
+        state = self._span_states.get(span)
+
+        if state is None:
+            return key_values
+
+        with state.condition:
+            key_values_fitted, size = budget.apply_budget(key_values=key_values,
+                                                          remaining=self._max_span_bytes - state.budget_used,
+                                                          policy=self._budget_policy)
+            state.budget_used += size
+
+            if key_values_fitted is None:
+                state.budget_dropped += 1
+            elif key_values_fitted is not key_values:
+                state.budget_truncated += 1
+
+        return key_values_fitted
+
+    def _log_batched(self, span: Span, key_values: Dict, timestamp: float):
+        """
+        Add a log to the buffer of the span and write the buffer if it is full or too old
+
+        :param span: Span to which the log belongs
+        :param key_values: Key-value pairs of the log
+        :param timestamp: Timestamp of the log
+        """
+        state = self._span_states.get(span)
+
+        if state is None:
+            span.log_kv(key_values, timestamp)
+            return
+
+        with state.condition:
+            state.batch.append((key_values, timestamp))
+
+            if (self._batch_size is not None and len(state.batch) >= self._batch_size) or \
+                    (self._batch_max_age is not None and timestamp - state.batch[0][1] >= self._batch_max_age):
+                self._write_batch(span=span, state=state)
+
+    def _write_batch(self, span: Span, state: SpanState):
+        """
+        Write the buffered logs of a span. The caller must hold the condition of the state.
+
+        The OpenTracing API has no call to log multiple key-value pairs at once. Therefore, each buffered log is
+        written with its own call of :func:`opentracing.span.log_kv` and its original timestamp.
+
+        :param span: Span to which the logs belong
+        :param state: State of the span
+        """
+        batch = state.batch
+        state.batch = []
+
+        start = perf_counter()
+        for key_values, timestamp in batch:
+            span.log_kv(key_values, timestamp)
+        self._stats.get().time_log_kv += perf_counter() - start
+
+    def _enqueue(self, span: Span, record: LogRecord):
+        """
+        Put a span and a snapshot of the record into the queue of an asynchronous handler
+
+        :param span: Span to which the record should be logged
+        :param record: Logging record
+        """
+        # raise wrong types of additional key-values in the logging call and not in the background thread
+        self._check_extra_kv(record=record)
+
+        # the record could still be modified by other handlers while it is waiting in the queue
+        snapshot = record.__class__.__new__(record.__class__)
+        snapshot.__dict__.update(record.__dict__)
+        # the arguments could be modified by the caller after the logging call
+        self.formatter.prepare(snapshot)
+
+        state = self._span_states.get(span)
+
+        if state is not None:
+            with state.condition:
+                state.pending += 1
+
+        if self._worker is None:
+            self._start_worker()
+
+        self._queue.put((span, snapshot, state))
+
+    def _start_worker(self):
+        """
+        Start the background thread of an asynchronous handler
+        """
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, name='OpenTracingHandler', daemon=True)
+                self._worker.start()
+
+    def _work(self):
+        """
+        Process the queue of an asynchronous handler until the handler is closed
+        """
+        while True:
+            item = self._queue.get()
+
+            try:
+                if item is _STOP:
+                    return
+
+                span, record, state = item
+
+                try:
+                    self._emit_to_span(span=span, record=record)
+                except Exception:
+                    self.handleError(record)
+                finally:
+                    if state is not None:
+                        with state.condition:
+                            state.pending -= 1
+                            state.condition.notify_all()
+            finally:
+                self._queue.task_done()
+
+    def _on_span_finish(self, span: Span, state: SpanState):
+        """
+        Called right before a span which has been logged to is finished
+
+        :param span: Span which will be finished
+        :param state: State of the span
+        """
+        # the logs of asynchronous handlers have to be in the span before it is finished
+        worker = self._worker
+
+        if worker is not None and worker is not threading.current_thread():
+            with state.condition:
+                while state.pending > 0 and worker.is_alive():
+                    state.condition.wait(timeout=0.1)
+
+        with state.condition:
+            self._write_batch(span=span, state=state)
+
+            # the span finished without an error
+            state.tail_buffer = None
+
+            if state.suppressed or state.budget_dropped or state.budget_truncated:
+                span.log_kv(self._suppressed_summary(state=state))
+
+    @staticmethod
+    def _suppressed_summary(state: SpanState) -> Dict:
+        """
+        Create a log which summarizes how many records have been suppressed for a span
+
+        :param state: State of the span
+        :return: Key-value pairs of the summary
+        """
+        key_values = {
+            logs.EVENT: 'suppressed',
+            logs.MESSAGE: f'{sum(state.suppressed.values()) + state.budget_dropped} log records have been suppressed',
+        }
+
+        for level, count in sorted(state.suppressed.items()):
+            key_values[f'suppressed.{getLevelName(level).lower()}'] = count
+
+        if state.budget_dropped:
+            key_values['suppressed.budget'] = state.budget_dropped
+        if state.budget_truncated:
+            key_values['truncated.budget'] = state.budget_truncated
+
+        return key_values
+
+    def _flush_batches(self):
+        """
+        Write the buffered logs of all spans
+        """
+        for span in self._span_states.spans():
+            state = self._span_states.get(span)
+
+            with state.condition:
+                self._write_batch(span=span, state=state)
+
+    def flush(self):
+        """
+        Wait until all queued records of an asynchronous handler have been logged and write all buffered logs
+        """
+        if self._worker is not None:
+            self._queue.join()
+
+        if self._batching:
+            self._flush_batches()
+
+    def close(self):
+        """
+        Log all queued records and stop the background thread of an asynchronous handler
+        """
+        worker = self._worker
+
+        if worker is not None:
+            self._queue.put(_STOP)
+            worker.join()
+            self._worker = None
+
+        if self._batching:
+            self._flush_batches()
+
+        super().close()
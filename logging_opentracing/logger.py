@@ -0,0 +1,77 @@
+"""
+A logger which does not create records that could not be logged to any span
+
+The OpenTracingHandler drops records for which it cannot find a span. By then, the logger has already looked up the
+caller of the logging call and created the record. When the OpenTracingHandlers are the only handlers of a logger,
+:class:`SpanAwareLogger` checks before this work whether any of them could find a span and skips the logging call
+otherwise.
+
+Use it for all loggers which are created afterwards with
+
+.. code-block:: python
+
+    logging.setLoggerClass(SpanAwareLogger)
+"""
+
+import logging
+from typing import Any, Mapping, Optional
+
+from .handler import OpenTracingHandler
+
+
+class SpanAwareLogger(logging.Logger):
+    """
+    Logger which skips logging calls when no handler would process their records.
+
+    A logging call is only skipped if
+
+    - the logger has no filters,
+    - the default record factory :class:`logging.LogRecord` is used, since custom record factories like
+      :func:`logging_opentracing.capture.span_capturing_record_factory` can add a span to the records,
+    - at least one handler is found in the hierarchy of the logger, otherwise :data:`logging.lastResort` handles the
+      record,
+    - all these handlers are :class:`OpenTracingHandler` instances which cannot find a span for the logging call, see
+      :meth:`OpenTracingHandler._may_log`.
+
+    Skipped logging calls are not counted in the statistics of the handlers.
+    """
+
+    def _log(self, level: int, msg: Any, args: Any, exc_info: Any = None, extra: Optional[Mapping[str, Any]] = None,
+             **kwargs):
+        if self._without_span(extra=extra):
+            return
+
+        super()._log(level, msg, args, exc_info=exc_info, extra=extra, **kwargs)
+
+    def _without_span(self, extra: Optional[Mapping[str, Any]]) -> bool:
+        """
+        Check if the record of a logging call would only be passed to OpenTracingHandlers which cannot find a span
+
+        :param extra: The parameter ``extra`` of the logging call
+        :return: Whether the logging call can be skipped
+        """
+        # filters of the logger could add a span to the record
+        if self.filters:
+            return False
+
+        # custom record factories could add a span to the record
+        if logging.getLogRecordFactory() is not logging.LogRecord:
+            return False
+
+        found = False
+        logger = self
+
+        # the same walk through the hierarchy as in logging.Logger.callHandlers
+        while logger:
+            for handler in logger.handlers:
+                if not isinstance(handler, OpenTracingHandler) or handler._may_log(extra=extra):
+                    return False
+
+                found = True
+
+            if not logger.propagate:
+                break
+
+            logger = logger.parent
+
+        return found
@@ -0,0 +1,115 @@
+"""
+Span resolvers which are used by the OpenTracingHandler to find the span of a record
+
+A span resolver is a callable which gets a :class:`logging.LogRecord` and returns the span to which the record should be
+logged or ``None`` if it cannot find a span. The resolvers of a handler are combined with :func:`chain` into a single
+callable when the handler is created.
+"""
+
+from logging import LogRecord
+from typing import Any, Callable, Optional, Sequence
+
+from opentracing import Span, Tracer
+
+#: Type of a span resolver
+SpanResolver = Callable[[LogRecord], Optional[Span]]
+
+#: Attribute of a record which holds a reference to the span that was active when the record was created. See
+#: :mod:`logging_opentracing.capture`.
+CAPTURED_SPAN_ATTR = 'opentracing_span_ref'
+
+
+def record_attribute(key: str) -> SpanResolver:
+    """
+    Resolve a span which has been passed with the ``extra`` parameter of a logging call
+
+    :param key: Key in the ``extra`` parameter, i.e. the attribute of the record
+    :return: Span resolver
+    """
+    def resolve(record: LogRecord) -> Optional[Span]:
+        return getattr(record, key, None)
+
+    return resolve
+
+
+def captured_span(attribute: str = CAPTURED_SPAN_ATTR) -> SpanResolver:
+    """
+    Resolve the span which has been captured when the record was created, see :mod:`logging_opentracing.capture`
+
+    :param attribute: Attribute of the record which holds the reference to the span
+    :return: Span resolver
+    """
+    def resolve(record: LogRecord) -> Optional[Span]:
+        ref = getattr(record, attribute, None)
+        return ref() if ref is not None else None
+
+    return resolve
+
+
+def context_var(var: Any) -> SpanResolver:
+    """
+    Resolve the span which is stored in a :class:`contextvars.ContextVar`, e.g. the current span of an asyncio task
+
+    :param var: Context variable which contains the current span or ``None``
+    :return: Span resolver
+    """
+    get = var.get
+
+    def resolve(record: LogRecord) -> Optional[Span]:
+        return get(None)
+
+    return resolve
+
+
+def scope_manager(tracer: Tracer) -> SpanResolver:
+    """
+    Resolve the span of the active scope of a tracer
+
+    :param tracer: Tracer whose scope manager is used
+    :return: Span resolver
+    """
+    manager = tracer.scope_manager
+
+    def resolve(record: LogRecord) -> Optional[Span]:
+        scope = manager.active
+
+        # a scope must be active, otherwise the log cannot be sent to OpenTracing
+        return scope.span if scope is not None else None
+
+    return resolve
+
+
+def chain(resolvers: Sequence[SpanResolver]) -> SpanResolver:
+    """
+    Combine span resolvers into a single resolver which returns the first span that is found
+
+    :param resolvers: Span resolvers ordered by their priority
+    :return: Span resolver
+    """
+    resolvers = tuple(resolvers)
+
+    if len(resolvers) == 0:
+        return lambda record: None
+
+    if len(resolvers) == 1:
+        return resolvers[0]
+
+    if len(resolvers) == 2:
+        first, second = resolvers
+
+        def resolve_two(record: LogRecord) -> Optional[Span]:
+            span = first(record)
+            return span if span is not None else second(record)
+
+        return resolve_two
+
+    def resolve(record: LogRecord) -> Optional[Span]:
+        for resolver in resolvers:
+            span = resolver(record)
+
+            if span is not None:
+                return span
+
+        return None
+
+    return resolve
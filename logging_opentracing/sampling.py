@@ -0,0 +1,53 @@
+"""
+Checks which can be passed as ``sampled_check`` to the OpenTracingHandler to skip logs of spans which are not sampled
+"""
+
+from opentracing import Span
+from opentracing.ext import tags
+
+#: Bit of the trace flags which marks a sampled span
+SAMPLED_FLAG = 0x01
+
+
+def context_sampled(span: Span) -> bool:
+    """
+    Check the sampling decision in the context of a span.
+
+    The OpenTracing API does not define how a span context provides its sampling decision. Therefore, the attributes
+    ``is_sampled`` (e.g. used by Jaeger), ``sampled`` and ``flags`` of the span context are checked in this order.
+
+    :param span: Span
+    :return: ``False`` if the span context marks the span as not sampled, otherwise, ``True``.
+    """
+    context = span.context
+
+    for attribute in ('is_sampled', 'sampled'):
+        sampled = getattr(context, attribute, None)
+
+        if sampled is not None:
+            return bool(sampled() if callable(sampled) else sampled)
+
+    flags = getattr(context, 'flags', None)
+
+    if isinstance(flags, int):
+        return bool(flags & SAMPLED_FLAG)
+
+    return True
+
+
+def sampling_priority_sampled(span: Span) -> bool:
+    """
+    Check the tag ``sampling.priority`` of a span.
+
+    The OpenTracing API does not provide access to the tags of a span. Therefore, this check only works with spans
+    which provide their tags as dictionary in the attribute ``tags`` like :class:`opentracing.mocktracer.MockSpan`.
+
+    :param span: Span
+    :return: ``False`` if the sampling priority is set to ``0``, otherwise, ``True``.
+    """
+    span_tags = getattr(span, 'tags', None)
+
+    if isinstance(span_tags, dict) and tags.SAMPLING_PRIORITY in span_tags:
+        return span_tags[tags.SAMPLING_PRIORITY] > 0
+
+    return True
@@ -0,0 +1,164 @@
+"""
+Serialization of the values which are logged to spans
+
+Without a serializer, the values of the key-value pairs are passed unchanged to :func:`opentracing.span.log_kv` and
+each tracer converts them in its own way, which can be slow for large objects. A :class:`ValueSerializer` converts them
+into predictable values with a bounded cost.
+"""
+
+import builtins
+import reprlib
+from typing import Any, Callable, Dict, Mapping, Optional
+
+#: Type of a converter which gets a value and returns its serialized value
+Converter = Callable[[Any], Any]
+
+#: Types whose values are passed through unchanged
+PRIMITIVE_TYPES = (str, int, float, bool, type(None))
+
+#: Maximum number of types for which the dispatched converters are cached
+_MAX_DISPATCH_CACHE = 1024
+
+#: Types without a method of :class:`reprlib.Repr` whose ``repr`` has a bounded length
+_SMALL_REPR_TYPES = frozenset((float, complex, bool, type(None), range, slice))
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def type_name_of(value_type: type) -> str:
+    """
+    Get the qualified name of a type. The module is omitted for builtins.
+
+    :param value_type: Type
+    :return: Qualified name of the type
+    """
+    module = value_type.__module__
+    return value_type.__qualname__ if module == 'builtins' else f'{module}.{value_type.__qualname__}'
+
+
+class _BoundedRepr(reprlib.Repr):
+    """
+    :class:`reprlib.Repr` which never calls the ``repr`` of arbitrary objects, whose cost and length are unknown.
+    Exceptions are represented by their type and their arguments and all other objects by their type.
+    """
+
+    def repr_instance(self, x: Any, level: int) -> str:
+        if type(x) in _SMALL_REPR_TYPES:
+            return builtins.repr(x)
+
+        if isinstance(x, (bytes, bytearray)):
+            return self.repr_str(x[:self.maxstring + 1], level)
+
+        if isinstance(x, BaseException):
+            args = self.repr1(x.args, level - 1) if x.args else '()'
+            # like the repr of exceptions, a single argument is not followed by a comma
+            return f'{type_name_of(type(x))}({args[1:-2] if args.endswith(",)") else args[1:-1]})'
+
+        return f'<{type_name_of(type(x))} object>'
+
+
+class ValueSerializer:
+    """
+    Convert values with converters which are registered for their types.
+
+    The converter of a value is looked up along the method resolution order of its type, such that converters also
+    apply to subclasses. The result of this lookup is cached per type. Primitive values are passed through unchanged,
+    types are converted into their qualified names and all other values into a size-bounded ``repr``. The ``repr``
+    is only built for builtin containers, strings and numbers. Exceptions are represented by their type and their
+    arguments and other objects only by their type, e.g. ``<mymodule.Point object>``, since their ``repr`` could be
+    arbitrarily expensive. Register ``repr`` or another converter for types whose ``repr`` should be logged.
+    """
+
+    def __init__(self, converters: Optional[Mapping[type, Converter]] = None, max_repr_length: int = 200,
+                 max_repr_items: int = 10):
+        """
+        :param converters: Converters for types in addition to or replacing the default converters
+        :param max_repr_length: Maximum length of the ``repr`` of values without converter
+        :param max_repr_items: Maximum number of items of containers in the ``repr`` of values without converter
+        """
+        self._repr = _BoundedRepr()
+        self._repr.maxstring = max_repr_length
+        self._repr.maxother = max_repr_length
+        self._repr.maxlist = self._repr.maxtuple = self._repr.maxdict = max_repr_items
+        self._repr.maxset = self._repr.maxfrozenset = self._repr.maxdeque = self._repr.maxarray = max_repr_items
+        self._max_repr_length = max_repr_length
+
+        self._converters = {primitive_type: _identity for primitive_type in PRIMITIVE_TYPES}
+        self._converters[type] = type_name_of
+
+        if converters is not None:
+            self._converters.update(converters)
+
+        #: Converters which have been looked up for types
+        self._dispatch = dict()
+
+    def register(self, value_type: type, converter: Converter):
+        """
+        Register a converter for a type and its subclasses
+
+        :param value_type: Type
+        :param converter: Converter which gets a value of the type and returns its serialized value
+        """
+        self._converters[value_type] = converter
+        self._dispatch = dict()
+
+    def bounded_repr(self, value: Any) -> str:
+        """
+        Get the ``repr`` of a value with a bounded length
+
+        :param value: Value
+        :return: Representation of the value
+        """
+        text = self._repr.repr(value)
+
+        if len(text) > self._max_repr_length:
+            # reprlib bounds the items of containers but not the total length
+            text = text[:self._max_repr_length - 3] + '...'
+
+        return text
+
+    def _lookup(self, value_type: type) -> Converter:
+        """
+        Find the converter of a type along its method resolution order
+        """
+        for base in value_type.__mro__:
+            converter = self._converters.get(base)
+
+            if converter is not None:
+                return converter
+
+        return self.bounded_repr
+
+    def serialize(self, value: Any) -> Any:
+        """
+        Serialize a value
+
+        :param value: Value
+        :return: Serialized value
+        """
+        value_type = type(value)
+        converter = self._dispatch.get(value_type)
+
+        if converter is None:
+            converter = self._lookup(value_type)
+
+            if len(self._dispatch) >= _MAX_DISPATCH_CACHE:
+                self._dispatch = dict()
+
+            self._dispatch[value_type] = converter
+
+        return converter(value)
+
+    __call__ = serialize
+
+    def serialize_kv(self, key_values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Serialize the values of key-value pairs
+
+        :param key_values: Key-value pairs
+        :return: Key-value pairs with serialized values
+        """
+        serialize = self.serialize
+        return {key: serialize(value) for key, value in key_values.items()}
@@ -0,0 +1,196 @@
+"""
+State which the OpenTracingHandler keeps for each span it logs to
+"""
+
+import threading
+from typing import Callable, List, Optional
+import weakref
+from weakref import WeakKeyDictionary
+
+from opentracing import Span
+
+#: Name of the attribute which is used to store the finish callbacks on a span
+_FINISH_CALLBACKS_ATTR = '_logging_opentracing_finish_callbacks'
+
+
+def add_finish_callback(span: Span, callback: Callable[[Span], None]) -> bool:
+    """
+    Register a callback which is called right before the span is finished.
+
+    The OpenTracing API does not provide a hook for finishing spans. Therefore, the method ``finish`` of the span
+    instance is wrapped once and all registered callbacks are called before the original method. The wrapper only
+    references the span weakly, such that the span does not end up in a reference cycle with its own ``finish``.
+
+    :param span: Span to which the callback should be attached
+    :param callback: Callable which gets the span as only argument
+    :return: ``True`` if the callback has been registered, ``False`` if the span does not allow to wrap ``finish``.
+    """
+    callbacks = getattr(span, _FINISH_CALLBACKS_ATTR, None)
+
+    if callbacks is None:
+        try:
+            span_ref = weakref.ref(span)
+        except TypeError:
+            return False
+
+        callbacks = []
+        original_finish = span.finish
+        # the bound method would reference the span, so its function is called with the span instead
+        bound = getattr(original_finish, '__self__', None) is span
+
+        if bound:
+            original_finish = original_finish.__func__
+
+        def finish(*args, **kwargs):
+            span = span_ref()
+
+            # callbacks should be called only once even if finish is called multiple times
+            while callbacks:
+                callbacks.pop(0)(span)
+
+            if bound:
+                return original_finish(span, *args, **kwargs)
+
+            return original_finish(*args, **kwargs)
+
+        try:
+            span.finish = finish
+            setattr(span, _FINISH_CALLBACKS_ATTR, callbacks)
+        except AttributeError:
+            return False
+
+    callbacks.append(callback)
+
+    return True
+
+
+class TokenBucket:
+    """
+    Token bucket to limit the rate of records
+    """
+
+    __slots__ = ('rate', 'burst', 'tokens', 'last')
+
+    def __init__(self, rate: float, burst: float, now: float):
+        """
+        :param rate: Number of tokens which are added per second
+        :param burst: Maximum number of tokens in the bucket. The bucket starts full.
+        :param now: Current time in seconds
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = now
+
+    def consume(self, now: float) -> bool:
+        """
+        Take one token out of the bucket
+
+        :param now: Current time in seconds
+        :return: ``True`` if a token was available, otherwise, ``False``.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+
+        return False
+
+
+class SpanState:
+    """
+    Mutable state of a single span. Attributes which can change after they have been set
+    must only be accessed while holding :attr:`condition`.
+    """
+
+    def __init__(self):
+        #: Condition to synchronize the access to the state and to wait for changes of the state
+        self.condition = threading.Condition()
+        #: Number of records which have been queued for this span but have not been processed yet
+        self.pending = 0
+        #: Buffered logs as pairs of key-values and timestamps which have not been written to the span yet
+        self.batch = []
+        #: Cached result of the sampled-check of the handler. ``None`` if the span has not been checked yet
+        self.sampled = None
+        #: Ring buffer of the records which are only logged when the span fails
+        self.tail_buffer = None
+        #: Has a failure of the span been logged, such that records are not kept in the ring buffer anymore?
+        self.tail_triggered = False
+        #: Token buckets for rate limiting with the logging levels as keys
+        self.buckets = dict()
+        #: Number of records which have been suppressed by rate limiting with the logging levels as keys
+        self.suppressed = dict()
+        #: Estimated number of bytes which have been logged to the span
+        self.budget_used = 0
+        #: Number of logs which have been dropped because they exceeded the budget
+        self.budget_dropped = 0
+        #: Number of logs which have been truncated because they exceeded the budget
+        self.budget_truncated = 0
+
+
+class SpanStateRegistry:
+    """
+    Registry of the :class:`SpanState` of each span. Spans are only weakly referenced, such that their states are
+    freed together with the spans.
+    """
+
+    def __init__(self, on_finish: Callable[[Span, SpanState], None]):
+        """
+        :param on_finish: Callable which is called right before a span which has a state is finished
+        """
+        self._on_finish = on_finish
+        self._lock = threading.Lock()
+        self._states = WeakKeyDictionary()
+
+    def get(self, span: Span) -> Optional[SpanState]:
+        """
+        Get the state of a span. A new state is created if the span has no state yet.
+
+        Without a state, the handler writes the logs of the span right away, since buffered logs could never be written
+        without being notified when the span finishes.
+
+        :param span: Span
+        :return: The state of the span or ``None`` if the span cannot be weakly referenced or does not allow to wrap
+            ``finish``
+        """
+        try:
+            state = self._states.get(span)
+        except TypeError:
+            return None
+
+        if state is None:
+            with self._lock:
+                state = self._states.get(span)
+
+                if state is None:
+                    if not add_finish_callback(span, self._finish):
+                        return None
+
+                    state = SpanState()
+                    self._states[span] = state
+
+        return state
+
+    def reset(self):
+        """
+        Forget the states of all spans, e.g. in a forked child process. The callbacks of the spans are kept but do not
+        find any states anymore.
+        """
+        self._lock = threading.Lock()
+        self._states = WeakKeyDictionary()
+
+    def spans(self) -> List[Span]:
+        """
+        :return: All spans which currently have a state
+        """
+        with self._lock:
+            return list(self._states.keys())
+
+    def _finish(self, span: Span):
+        with self._lock:
+            state = self._states.pop(span, None)
+
+        if state is not None:
+            self._on_finish(span, state)
@@ -0,0 +1,186 @@
+"""
+Rendering of the stacks of exceptions for the OpenTracingFormatter
+"""
+
+import builtins
+from collections import OrderedDict
+import linecache
+import threading
+import traceback
+from types import TracebackType
+from typing import List, Optional, Tuple
+
+#: Base class of exception groups which are available since Python 3.11
+_BASE_EXCEPTION_GROUP = getattr(builtins, 'BaseExceptionGroup', ())
+
+
+def traceback_signature(tb: Optional[TracebackType]) -> Tuple:
+    """
+    Get a signature of a traceback which is equal for tracebacks that are rendered to the same stack
+
+    :param tb: Traceback
+    :return: Tuple of the code object, line number and last instruction of each frame
+    """
+    signature = []
+
+    while tb is not None:
+        signature.append((tb.tb_frame.f_code, tb.tb_lineno, tb.tb_lasti))
+        tb = tb.tb_next
+
+    return tuple(signature)
+
+
+class StackRenderer:
+    """
+    Render tracebacks like :func:`traceback.print_tb` and keep the rendered stacks in a bounded LRU cache, such that
+    repeated identical failures are only rendered once.
+
+    The size and the cost of the rendering can be bounded by omitting the source lines, which are read from the source
+    files, and by limiting the number of frames and the length of the stack.
+    """
+
+    def __init__(self, cache_size: int = 128, source_lines: bool = True, max_frames: Optional[int] = None,
+                 max_length: Optional[int] = None):
+        """
+        :param cache_size: Maximum number of rendered stacks in the cache. The cache is disabled with ``0``.
+        :param source_lines: Render the source line of each frame. Without source lines, no source files are read.
+        :param max_frames: Maximum number of rendered frames. The outermost and the innermost frames are kept and the
+            frames in between are replaced by a line which reports how many frames have been omitted.
+        :param max_length: Maximum length of the stack. Characters in the middle of longer stacks are replaced by a
+            line which reports how many characters have been omitted.
+        """
+        if max_frames is not None and max_frames < 1:
+            raise ValueError('At least one frame must be rendered')
+
+        self._source_lines = source_lines
+        self._max_frames = max_frames
+        self._max_length = max_length
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def bounded(self) -> bool:
+        """
+        Whether the rendered stacks can differ from the stacks of :func:`traceback.print_tb`
+        """
+        return not self._source_lines or self._max_frames is not None or self._max_length is not None
+
+    def render(self, tb: Optional[TracebackType]) -> str:
+        """
+        Render a traceback
+
+        :param tb: Traceback
+        :return: The stack in the same format as :func:`traceback.print_tb`
+        """
+        if self._cache_size <= 0:
+            return self._render(tb=tb)
+
+        signature = traceback_signature(tb=tb)
+
+        with self._lock:
+            stack = self._cache.get(signature)
+
+            if stack is not None:
+                self._cache.move_to_end(signature)
+                return stack
+
+        stack = self._render(tb=tb)
+
+        with self._lock:
+            self._cache[signature] = stack
+
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+        return stack
+
+    def _render(self, tb: Optional[TracebackType]) -> str:
+        """
+        Render a traceback without the cache
+        """
+        if self._source_lines and self._max_frames is None:
+            stack = ''.join(traceback.extract_tb(tb).format())
+        else:
+            stack = ''.join(self._render_frames(tb=tb))
+
+        if self._max_length is not None and len(stack) > self._max_length:
+            stack = self._truncate(stack=stack)
+
+        return stack
+
+    def _render_frames(self, tb: Optional[TracebackType]) -> List[str]:
+        """
+        Render the frames of a traceback one by one, such that only the frames which are kept are looked up
+
+        :param tb: Traceback
+        :return: Rendered lines of the stack
+        """
+        frames = list(traceback.walk_tb(tb))
+        omitted = 0
+
+        if self._max_frames is not None and len(frames) > self._max_frames:
+            outermost = self._max_frames // 2
+            innermost = self._max_frames - outermost
+            omitted = len(frames) - self._max_frames
+            frames = frames[:outermost] + frames[-innermost:]
+        else:
+            outermost = len(frames)
+
+        lines = []
+
+        for i, (frame, lineno) in enumerate(frames):
+            if omitted and i == outermost:
+                lines.append(f'  ... {omitted} frames omitted ...\n')
+
+            code = frame.f_code
+            lines.append(f'  File "{code.co_filename}", line {lineno}, in {code.co_name}\n')
+
+            if self._source_lines:
+                line = linecache.getline(code.co_filename, lineno, frame.f_globals).strip()
+
+                if line:
+                    lines.append(f'    {line}\n')
+
+        return lines
+
+    def _truncate(self, stack: str) -> str:
+        """
+        Truncate a stack to the maximum length by omitting characters in the middle
+
+        :param stack: Stack which is longer than the maximum length
+        :return: Truncated stack
+        """
+        marker = f'\n  ... {len(stack) - self._max_length} characters omitted ...\n'
+        length = max(self._max_length - len(marker), 0)
+        head = length // 2
+        tail = length - head
+
+        return stack[:head] + marker + (stack[-tail:] if tail > 0 else '')
+
+
+def format_exc_text(exc_info: Tuple, stack: str) -> Optional[str]:
+    """
+    Compose the text of :meth:`logging.Formatter.formatException` from an already rendered stack.
+
+    This is only possible for simple exceptions. ``None`` is returned for chained exceptions and exception groups,
+    which have to be formatted by :meth:`logging.Formatter.formatException`.
+
+    :param exc_info: Exception information as returned by :func:`sys.exc_info`
+    :param stack: Stack of the traceback of the exception as rendered by :class:`StackRenderer`
+    :return: The exception text or ``None``
+    """
+    exc_type, exc_value, exc_tb = exc_info
+
+    if exc_value is not None:
+        if exc_value.__cause__ is not None or \
+                (exc_value.__context__ is not None and not exc_value.__suppress_context__) or \
+                isinstance(exc_value, _BASE_EXCEPTION_GROUP):
+            return None
+
+    text = ''.join(traceback.format_exception_only(exc_type, exc_value))
+
+    if exc_tb is not None:
+        text = f'Traceback (most recent call last):\n{stack}{text}'
+
+    return text[:-1] if text.endswith('\n') else text
@@ -0,0 +1,122 @@
+"""
+Internal statistics of the OpenTracingHandler
+"""
+
+import threading
+from typing import Dict, Union
+import weakref
+
+
+class HandlerStats:
+    """
+    Counters and cumulative timings of an :class:`OpenTracingHandler`. Timings are in seconds.
+    """
+
+    __slots__ = (
+        'records_seen',
+        'records_dropped_no_span',
+        'records_dropped_unsampled',
+        'records_dropped_rate_limit',
+        'records_dropped_budget',
+        'records_formatted',
+        'exceptions_rendered',
+        'extra_kv_type_errors',
+        'time_span_lookup',
+        'time_format',
+        'time_log_kv',
+    )
+
+    def __init__(self):
+        #: Number of records which have been passed to ``emit``
+        self.records_seen = 0
+        #: Number of records which have been dropped because no span could be found
+        self.records_dropped_no_span = 0
+        #: Number of records which have been dropped because their span is not sampled
+        self.records_dropped_unsampled = 0
+        #: Number of records which have been dropped by rate limiting
+        self.records_dropped_rate_limit = 0
+        #: Number of records which have been dropped because the budget of their span was used up
+        self.records_dropped_budget = 0
+        #: Number of records which have been formatted
+        self.records_formatted = 0
+        #: Number of formatted records with exception information
+        self.exceptions_rendered = 0
+        #: Number of records with additional key-values which are not a dictionary
+        self.extra_kv_type_errors = 0
+        #: Time spent in resolving the spans of the records
+        self.time_span_lookup = 0.0
+        #: Time spent in formatting the records
+        self.time_format = 0.0
+        #: Time spent in :func:`opentracing.span.log_kv`
+        self.time_log_kv = 0.0
+
+    def as_dict(self) -> Dict[str, Union[int, float]]:
+        """
+        :return: All counters and timings with their names as keys
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def add(self, other: 'HandlerStats'):
+        """
+        Add the counters and timings of other statistics to these statistics
+
+        :param other: Other statistics
+        """
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+
+class ThreadStats:
+    """
+    Statistics which are kept separately for each thread, such that threads can update them without locks
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        #: Statistics of all threads together with weak references to their threads
+        self._threads = []
+        #: Sum of the statistics of threads which are not alive anymore
+        self._retired = HandlerStats()
+
+    def get(self) -> HandlerStats:
+        """
+        :return: Statistics of the current thread
+        """
+        try:
+            return self._local.stats
+        except AttributeError:
+            pass
+
+        stats = self._local.stats = HandlerStats()
+
+        with self._lock:
+            # fold the statistics of finished threads, such that they do not accumulate
+            threads = []
+
+            for thread_ref, thread_stats in self._threads:
+                thread = thread_ref()
+
+                if thread is not None and thread.is_alive():
+                    threads.append((thread_ref, thread_stats))
+                else:
+                    self._retired.add(thread_stats)
+
+            threads.append((weakref.ref(threading.current_thread()), stats))
+            self._threads = threads
+
+        return stats
+
+    def as_dict(self) -> Dict[str, Union[int, float]]:
+        """
+        :return: Sum of the statistics of all threads with their names as keys
+        """
+        total = HandlerStats()
+
+        with self._lock:
+            total.add(self._retired)
+
+            for _, thread_stats in self._threads:
+                total.add(thread_stats)
+
+        return total.as_dict()
@@ -0,0 +1,64 @@
+"""
+Timestamps of the logs which are written to spans
+
+The OpenTracingHandler logs each record with a timestamp which is taken from the record, such that logs which are
+written later, e.g. by an asynchronous handler or in batches, keep the time of the logging call.
+
+``record.created`` is derived from :func:`time.time`, whose resolution is coarse on some platforms. For higher
+resolution, :func:`capture_monotonic` stores the value of :func:`time.perf_counter` on the record when it is created,
+which :func:`high_resolution` converts into wall clock time with an anchor that pairs both clocks.
+"""
+
+from logging import LogRecord
+import time
+from typing import Callable, Optional
+
+#: Type of a function which gets a record and returns the timestamp of its log or ``None`` to let the tracer use the
+#: current time
+TimestampSource = Callable[[LogRecord], Optional[float]]
+
+#: Attribute of a record which holds the value of :func:`time.perf_counter` when the record was created
+MONOTONIC_ATTR = 'opentracing_monotonic'
+
+#: Wall clock time and :func:`time.perf_counter` at the same moment, which are used to convert monotonic times into
+#: wall clock times
+_ANCHOR = (time.time(), time.perf_counter())
+
+
+def capture_monotonic(record: LogRecord):
+    """
+    Store the current value of :func:`time.perf_counter` under :data:`MONOTONIC_ATTR`
+
+    :param record: Logging record which has just been created
+    """
+    setattr(record, MONOTONIC_ATTR, time.perf_counter())
+
+
+def record_created(record: LogRecord) -> float:
+    """
+    Use the creation time of a record as timestamp
+
+    :param record: Logging record
+    :return: ``record.created``
+    """
+    return record.created
+
+
+def high_resolution(record: LogRecord) -> float:
+    """
+    Use the monotonic time which has been captured when the record was created, converted into wall clock time.
+    Records without a captured monotonic time fall back to ``record.created``.
+
+    The timestamps of records of the same process keep the order and the distances of the monotonic clock, but they
+    can deviate from ``record.created`` if the wall clock is adjusted while the process is running.
+
+    :param record: Logging record
+    :return: Timestamp in seconds since the epoch
+    """
+    monotonic = getattr(record, MONOTONIC_ATTR, None)
+
+    if monotonic is None:
+        return record.created
+
+    wall, anchor = _ANCHOR
+    return wall + (monotonic - anchor)
@@ -0,0 +1,69 @@
+"""
+Test the cached rendering of the time of records
+"""
+
+import logging
+import threading
+
+from logging_opentracing import OpenTracingFormatter
+from logging_opentracing.asctime import AsctimeRenderer
+import pytest
+
+
+def create_record(created: float) -> logging.LogRecord:
+    """
+    Create a record with a given creation time
+    """
+    record = logging.LogRecord('Asctime', logging.INFO, __file__, 1, 'spam', None, None)
+    record.created = created
+    record.msecs = (created - int(created)) * 1000
+
+    return record
+
+
+@pytest.mark.parametrize('date_format', [None, '%Y-%m-%d %H:%M:%S', '%H:%M'])
+def test_same_as_logging(date_format):
+    """
+    Test that the time is rendered like logging.Formatter.formatTime within the same and across seconds
+    """
+    renderer = AsctimeRenderer(date_format=date_format)
+    formatter = logging.Formatter(datefmt=date_format)
+
+    for created in [1600000000.0, 1600000000.123, 1600000000.999, 1600000001.5, 1600000000.25, 1600086400.007]:
+        record = create_record(created=created)
+        assert renderer.render(record=record) == formatter.formatTime(record=record, datefmt=date_format)
+
+
+def test_threads():
+    """
+    Test that threads which render different seconds at the same time get the correct times
+    """
+    renderer = AsctimeRenderer()
+    formatter = logging.Formatter()
+    errors = []
+
+    def render(offset: int):
+        for i in range(1000):
+            record = create_record(created=1600000000 + (i + offset) % 7 + 0.5)
+
+            if renderer.render(record=record) != formatter.formatTime(record=record):
+                errors.append(record.created)
+
+    threads = [threading.Thread(target=render, args=(offset,)) for offset in range(4)]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+
+
+def test_formatter_date_format():
+    """
+    Test that the date format of the OpenTracingFormatter is used
+    """
+    formatter = OpenTracingFormatter(kv_format={'time': '%(asctime)s'}, date_format='%Y/%m/%d')
+    record = create_record(created=1600000000.5)
+
+    assert formatter.format(record) == {'time': logging.Formatter(datefmt='%Y/%m/%d').formatTime(record, '%Y/%m/%d')}
@@ -0,0 +1,168 @@
+"""
+Test the asynchronous mode of the OpenTracingHandler
+"""
+
+import logging
+import os
+
+from logging_opentracing import OpenTracingFormatter, OpenTracingHandler
+import pytest
+
+from .util import check_finished_spans, tracer
+
+TEST_LOG = {'event': 'info', 'message': 'This is an asynchronous log'}
+
+
+@pytest.fixture
+def async_handler(tracer):
+    """
+    Get an asynchronous OpenTracingHandler which is closed after the test
+    """
+    handler = OpenTracingHandler(tracer=tracer, asynchronous=True, queue_size=10)
+
+    yield handler
+
+    handler.close()
+
+
+@pytest.fixture
+def async_logger(async_handler):
+    """
+    Get a logger with an asynchronous OpenTracingHandler
+    """
+    logger = logging.getLogger('Async')
+    logger.setLevel(logging.DEBUG)
+
+    # this fixture is called multiple times and we have to remove the handlers added from the previous fixture call
+    logger.handlers.clear()
+
+    logger.addHandler(async_handler)
+
+    return logger
+
+
+def test_logs_before_finish(tracer, async_logger):
+    """
+    Test that all queued logs are in the span when it is finished
+    """
+    operation_name = 'async_span'
+    logs = [{**TEST_LOG, 'message': f'{TEST_LOG["message"]}_{i}'} for i in range(100)]
+
+    with tracer.start_active_span(operation_name):
+        for log in logs:
+            async_logger.info(log['message'])
+
+    check_finished_spans(tracer=tracer, operation_names_expected=[operation_name],
+                         logs_expected={operation_name: logs})
+
+
+def test_timestamp(tracer, async_logger):
+    """
+    Test that the logs keep the creation time of the records
+    """
+    records = []
+    async_logger.addFilter(lambda record: records.append(record) or True)
+
+    with tracer.start_active_span('async_timestamp'):
+        async_logger.info(TEST_LOG['message'])
+
+    assert tracer.finished_spans()[0].logs[0].timestamp == records[0].created
+
+
+def test_flush(tracer, async_handler, async_logger):
+    """
+    Test that flushing the handler logs all queued records
+    """
+    span = tracer.start_span('async_flush')
+    async_logger.info(TEST_LOG['message'], extra={'span': span})
+
+    async_handler.flush()
+
+    assert [log.key_values for log in span.logs] == [TEST_LOG]
+
+
+def test_close(tracer, async_handler, async_logger):
+    """
+    Test that closing the handler logs all queued records and stops the background thread
+    """
+    span = tracer.start_span('async_close')
+    async_logger.info(TEST_LOG['message'], extra={'span': span})
+
+    worker = async_handler._worker
+    async_handler.close()
+
+    assert not worker.is_alive()
+    assert [log.key_values for log in span.logs] == [TEST_LOG]
+
+
+def test_extra_kv_wrong_type(tracer, async_logger):
+    """
+    Test that a wrong type of the additional key-values is raised in the logging call
+    """
+    with pytest.raises(TypeError):
+        with tracer.start_active_span('async_wrong_type'):
+            async_logger.info('Wrong type', extra={'kv': 'this should be a dict and not a string'})
+
+
+@pytest.mark.parametrize('structured_message', [False, True])
+def test_mutable_args(tracer, async_handler, async_logger, structured_message):
+    """
+    Test that the message is interpolated in the logging call and not with later values of mutable arguments
+    """
+    async_handler.setFormatter(OpenTracingFormatter(structured_message=structured_message))
+    items = [1]
+
+    # keep the record in the queue until the arguments have been changed
+    async_handler._start_worker = lambda: None
+
+    with tracer.start_active_span('async_mutable_args'):
+        async_logger.info('items %s', items)
+        items.append(2)
+
+        del async_handler._start_worker
+        async_handler._start_worker()
+
+    key_values = tracer.finished_spans()[0].logs[0].key_values
+
+    if structured_message:
+        # structured messages log the arguments themselves like synchronous handlers
+        assert key_values == {'event': 'info', 'message': 'items %s', 'args.0': [1, 2]}
+    else:
+        assert key_values == {'event': 'info', 'message': 'items [1]'}
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='fork is not available')
+def test_fork(tracer, async_handler, async_logger):
+    """
+    Test that a forked child process starts with an empty queue and does not log the records of the parent
+    """
+    span = tracer.start_span('async_fork_parent')
+
+    # keep the records in the queue while forking
+    async_handler._start_worker = lambda: None
+    async_logger.info(TEST_LOG['message'], extra={'span': span})
+    del async_handler._start_worker
+
+    pid = os.fork()
+
+    if pid == 0:
+        # the child must not raise, since pytest would continue to run in it
+        try:
+            child_span = tracer.start_span('async_fork_child')
+            async_logger.info(TEST_LOG['message'], extra={'span': child_span})
+            child_span.finish()
+            span.finish()
+
+            ok = async_handler._queue.empty() and len(child_span.logs) == 1 and len(span.logs) == 0
+        except BaseException:
+            ok = False
+        finally:
+            os._exit(0 if ok else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+    async_handler._start_worker()
+    span.finish()
+
+    assert [log.key_values for log in span.logs] == [TEST_LOG]
@@ -0,0 +1,77 @@
+"""
+Test buffering the logs of each span in batches
+"""
+
+import logging
+
+from logging_opentracing import OpenTracingHandler
+import pytest
+
+from .util import check_finished_spans, get_logger, tracer
+
+LOGS = [{'event': 'info', 'message': f'Batched log {i}'} for i in range(7)]
+
+
+def test_batch_size(tracer):
+    """
+    Test that the buffer is written whenever it is full and the rest when the span finishes
+    """
+    operation_name = 'batch_size'
+    logger = get_logger(OpenTracingHandler(tracer=tracer, batch_size=3), name='BatchSize')
+
+    with tracer.start_active_span(operation_name) as scope:
+        for i, log in enumerate(LOGS):
+            logger.info(log['message'])
+            assert len(scope.span.logs) == (i + 1) // 3 * 3
+
+    check_finished_spans(tracer=tracer, operation_names_expected=[operation_name],
+                         logs_expected={operation_name: LOGS})
+
+
+def test_batch_timestamps(tracer):
+    """
+    Test that the buffered logs keep the creation time of the records
+    """
+    records = []
+    logger = get_logger(OpenTracingHandler(tracer=tracer, batch_size=100), name='BatchTimestamps')
+    logger.addFilter(lambda record: records.append(record) or True)
+
+    with tracer.start_active_span('batch_timestamps'):
+        for log in LOGS:
+            logger.info(log['message'])
+
+    assert [log.timestamp for log in tracer.finished_spans()[0].logs] == [record.created for record in records]
+
+
+def test_batch_max_age(tracer):
+    """
+    Test that the buffer is written when a log is too much younger than the oldest buffered log
+    """
+    logger = get_logger(OpenTracingHandler(tracer=tracer, batch_max_age=10), name='BatchMaxAge')
+
+    with tracer.start_active_span('batch_max_age') as scope:
+        logger.info(LOGS[0]['message'])
+        logger.info(LOGS[1]['message'])
+        assert len(scope.span.logs) == 0
+
+        record = logger.makeRecord(logger.name, logging.INFO, __file__, 0, LOGS[2]['message'], None, None)
+        record.created += 10
+        logger.handle(record)
+        assert len(scope.span.logs) == 3
+
+
+@pytest.mark.parametrize('method', ['flush', 'close'])
+def test_batch_flush(tracer, method):
+    """
+    Test that flushing or closing the handler writes the buffered logs
+    """
+    handler = OpenTracingHandler(tracer=tracer, batch_size=100)
+    logger = get_logger(handler, name='BatchFlush')
+
+    span = tracer.start_span('batch_flush')
+    logger.info(LOGS[0]['message'], extra={'span': span})
+    assert len(span.logs) == 0
+
+    getattr(handler, method)()
+
+    assert [log.key_values for log in span.logs] == [LOGS[0]]
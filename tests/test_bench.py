@@ -0,0 +1,46 @@
+"""
+Test the micro-benchmarks
+"""
+
+import json
+
+from logging_opentracing import bench
+
+
+def test_bench(capsys):
+    """
+    Test that all benchmarks run and report their results as JSON
+    """
+    assert bench.main(['--iterations', '5', '--repeat', '2']) == 0
+
+    output = json.loads(capsys.readouterr().out)
+
+    assert output['iterations'] == 5
+    assert {(result['scenario'], result['tracer'], result['target']) for result in output['results']} == \
+        {(scenario, tracer, target) for scenario in bench.SCENARIOS for tracer in bench.TRACERS
+         for target in bench.TARGETS}
+    assert all(result['best_ns_per_record'] > 0 for result in output['results'])
+
+
+def test_bench_selection(capsys):
+    """
+    Test selecting scenarios, tracers and targets
+    """
+    bench.main(['--iterations', '5', '--repeat', '1', '--scenario', 'exception', '--tracer', 'noop',
+                '--target', 'emit'])
+
+    output = json.loads(capsys.readouterr().out)
+
+    assert [(result['scenario'], result['tracer'], result['target']) for result in output['results']] == \
+        [('exception', 'noop', 'emit')]
+
+
+def test_bench_memory():
+    """
+    Test that the formatter which does not mutate the records leaves less memory allocated on the records
+    """
+    results = {scenario: bench.run(scenario_name=scenario, tracer_name='noop', target='format', iterations=200,
+                                   repeat=1, memory=True)['retained_bytes_per_record']
+               for scenario in ['default', 'no_mutation']}
+
+    assert results['no_mutation'] < results['default']
@@ -0,0 +1,88 @@
+"""
+Test the byte budget for the logs of a span
+"""
+
+from logging_opentracing import OpenTracingHandler
+from logging_opentracing.budget import DROP, TRUNCATE, estimate_size
+import pytest
+
+from .util import check_finished_spans, get_logger, tracer
+
+
+@pytest.mark.parametrize('value,size', [
+    ('spam', 4),
+    (b'eggs', 4),
+    (42, 8),
+    (None, 8),
+    ([1, 'ab'], 10),
+    ({'a': 'bc'}, 3),
+    (ValueError, len('ValueError')),
+])
+def test_estimate_size(value, size):
+    """
+    Test estimating the size of values
+    """
+    assert estimate_size(value) == size
+
+
+@pytest.mark.parametrize('policy,logs_expected', [
+    (TRUNCATE, [{'event': 'info', 'message': 'spam'}, {'event': 'info', 'message': 'e...'}]),
+    (DROP, [{'event': 'info', 'message': 'spam'}]),
+])
+def test_policy(tracer, policy, logs_expected):
+    """
+    Test that logs exceeding the budget are truncated or dropped and summarized when the span finishes
+    """
+    operation_name = 'budget'
+    # each log has the keys "event" and "message" and the value "info" which are 16 bytes
+    logger = get_logger(OpenTracingHandler(tracer=tracer, max_span_bytes=40, budget_policy=policy), name='Budget')
+
+    with tracer.start_active_span(operation_name):
+        logger.info('spam')
+        logger.info('eggs and bacon')
+        logger.info('no budget left')
+
+    summary = {'event': 'suppressed', 'message': '2 log records have been suppressed', 'suppressed.budget': 2}
+    if policy == TRUNCATE:
+        summary = {**summary, 'message': '1 log records have been suppressed', 'suppressed.budget': 1,
+                   'truncated.budget': 1}
+
+    check_finished_spans(tracer=tracer, operation_names_expected=[operation_name],
+                         logs_expected={operation_name: logs_expected + [summary]})
+
+
+def recurse(depth: int):
+    """
+    Raise a RecursionError with a deep stack
+    """
+    if depth == 0:
+        raise RecursionError()
+
+    recurse(depth=depth - 1)
+
+
+def test_extra_kv_and_stack(tracer):
+    """
+    Test that additional key-values and the stack of exceptions count towards the budget
+    """
+    logger = get_logger(OpenTracingHandler(tracer=tracer, max_span_bytes=200, budget_policy=DROP), name='Budget')
+
+    with tracer.start_active_span('budget_stack') as scope:
+        logger.info('extra', extra={'kv': {'payload': 'x' * 200}})
+
+        try:
+            recurse(depth=10)
+        except RecursionError:
+            logger.exception('exception')
+
+        logger.info('fits')
+
+        assert [log.key_values for log in scope.span.logs] == [{'event': 'info', 'message': 'fits'}]
+
+
+def test_unknown_policy(tracer):
+    """
+    Test that an unknown policy is rejected
+    """
+    with pytest.raises(ValueError):
+        OpenTracingHandler(tracer=tracer, max_span_bytes=100, budget_policy='spam')
@@ -0,0 +1,116 @@
+"""
+Test capturing the active span when a record is created
+"""
+
+import copy
+import gc
+import logging
+from logging.handlers import QueueHandler, QueueListener, SocketHandler
+import pickle
+from queue import Queue
+
+from logging_opentracing import OpenTracingHandler
+from logging_opentracing.capture import SpanCaptureFilter, span_capturing_record_factory
+from logging_opentracing.resolvers import CAPTURED_SPAN_ATTR, captured_span
+import pytest
+
+from .util import check_finished_spans, tracer
+
+TEST_LOG = {'event': 'info', 'message': 'This is a test log'}
+
+
+@pytest.fixture
+def queue_logger():
+    """
+    Get a logger which passes its records to a queue
+    """
+    log_queue = Queue()
+
+    logger = logging.getLogger('Capture')
+    logger.setLevel(logging.DEBUG)
+
+    # this fixture is called multiple times and we have to remove the handlers added from the previous fixture call
+    logger.handlers.clear()
+    logger.addHandler(QueueHandler(log_queue))
+
+    return logger, log_queue
+
+
+def test_queue_listener(tracer, queue_logger):
+    """
+    Test that records handled by a QueueListener in another thread are logged to the span of the logging call
+    """
+    operation_name = 'capture_queue_listener'
+    logger, log_queue = queue_logger
+    logger.handlers[0].addFilter(SpanCaptureFilter(tracer=tracer))
+
+    listener = QueueListener(log_queue, OpenTracingHandler(tracer=tracer))
+    listener.start()
+
+    with tracer.start_active_span(operation_name):
+        logger.info(TEST_LOG['message'])
+        listener.stop()
+
+    check_finished_spans(tracer=tracer, operation_names_expected=[operation_name],
+                         logs_expected={operation_name: [TEST_LOG]})
+
+
+def test_record_factory(tracer):
+    """
+    Test that the record factory captures the active span
+    """
+    factory = span_capturing_record_factory(tracer=tracer)
+
+    with tracer.start_active_span('capture_record_factory') as scope:
+        record = factory('Capture', logging.INFO, __file__, 0, TEST_LOG['message'], None, None)
+
+    assert captured_span()(record) is scope.span
+
+    record_without_span = factory('Capture', logging.INFO, __file__, 0, TEST_LOG['message'], None, None)
+
+    assert not hasattr(record_without_span, CAPTURED_SPAN_ATTR)
+
+
+def test_weak_reference(tracer):
+    """
+    Test that the captured span is not kept alive by the record
+    """
+    record = logging.makeLogRecord({'msg': TEST_LOG['message']})
+    span = tracer.start_span('capture_weak_reference')
+
+    SpanCaptureFilter(resolver=lambda _: span).filter(record)
+    assert captured_span()(record) is span
+
+    del span
+    gc.collect()
+
+    assert captured_span()(record) is None
+
+
+def test_pickle(tracer):
+    """
+    Test that records with a captured span can be pickled, e.g. to be sent to another process, without the span
+    """
+    factory = span_capturing_record_factory(tracer=tracer)
+
+    with tracer.start_active_span('capture_pickle') as scope:
+        record = factory('Capture', logging.INFO, __file__, 0, TEST_LOG['message'], None, None)
+
+    data = SocketHandler('localhost', None).makePickle(record)
+    record_dict = pickle.loads(data[4:])
+
+    assert record_dict['msg'] == TEST_LOG['message']
+    assert record_dict[CAPTURED_SPAN_ATTR] is None
+    assert captured_span()(logging.makeLogRecord(record_dict)) is None
+
+    # copies within the process keep the span
+    assert captured_span()(copy.copy(record)) is scope.span
+    assert captured_span()(copy.deepcopy(record)) is scope.span
+
+
+def test_missing_tracer():
+    """
+    Test that either a tracer or a resolver is required
+    """
+    with pytest.raises(ValueError):
+        SpanCaptureFilter()
@@ -0,0 +1,57 @@
+"""
+Test logging snapshots of exceptions instead of the exceptions
+"""
+
+import gc
+import logging
+import weakref
+
+from logging_opentracing import OpenTracingHandler, OpenTracingFormatter
+from logging_opentracing.formatter import ExceptionSnapshot
+
+from .util import tracer
+
+
+class Payload:
+    """
+    Local variable of a failing frame whose lifetime is checked
+    """
+
+
+def fail(payload_refs: list):
+    payload = Payload()
+    payload_refs.append(weakref.ref(payload))
+    raise KeyError('spam', 42)
+
+
+def test_exception_snapshot(tracer):
+    """
+    Test that a snapshot is logged and that the frames of the exception can be garbage collected after the log
+    """
+    logger = logging.getLogger('ExceptionSnapshot')
+    logger.setLevel(logging.DEBUG)
+    # the log capturing of pytest would keep the record and therefore the exception alive
+    logger.propagate = False
+    logger.handlers.clear()
+    logger.addHandler(OpenTracingHandler(tracer=tracer, formatter=OpenTracingFormatter(exception_snapshot=True)))
+
+    payload_refs = []
+
+    with tracer.start_active_span('exception_snapshot') as scope:
+        try:
+            fail(payload_refs)
+        except KeyError:
+            logger.exception('failed')
+
+    gc.collect()
+
+    key_values = scope.span.logs[0].key_values
+    snapshot = key_values['error.object']
+
+    assert isinstance(snapshot, ExceptionSnapshot)
+    assert snapshot.type_name == key_values['error.kind'] == 'KeyError'
+    assert snapshot.message == "('spam', 42)"
+    assert snapshot.args_repr == "('spam', 42)"
+    assert snapshot.stack == key_values['stack']
+    assert 'in fail' in snapshot.stack
+    assert payload_refs[0]() is None
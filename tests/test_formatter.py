@@ -3,6 +3,7 @@ Test the OpenTracingFormatter
 """
 
 import logging
+import sys
 
 from logging_opentracing import OpenTracingHandler, OpenTracingFormatter
 import pytest
@@ -17,6 +18,13 @@ MESSAGE = 'We are the knights who say "Ni!"'
     ({'event': '%(levelname)s'}, {'event': 'INFO'}),
     ({'event': '%(levelname_lower)s'}, {'event': 'info'}),
     ({'message': '%(message)s', 'foo': 'bar'}, {'message': MESSAGE, 'foo': 'bar'}),
+    ({'message': ''}, {'message': MESSAGE}),
+    ({'a': '%(levelname)s: %(message)s', 'b': '%(name)s - %(levelname)s', 'c': '100%%'},
+     {'a': f'INFO: {MESSAGE}', 'b': 'CustomFormatter - INFO', 'c': '100%'}),
+    ({'service': 'billing', 'message': '%(message)s', 'escaped': '%%(message)s'},
+     {'service': 'billing', 'message': MESSAGE, 'escaped': '%(message)s'}),
+    ({'service': 'billing', 'load': '100%%'}, {'service': 'billing', 'load': '100%'}),
+    (dict(), dict()),
 ])
 def test_custom_formats(tracer, kv_format, expected):
     """
@@ -37,3 +45,147 @@ def test_custom_formats(tracer, kv_format, expected):
 
     check_finished_spans(tracer=tracer, operation_names_expected=[operation_name],
                          logs_expected={operation_name: [expected]})
+
+
+def test_missing_field(tracer):
+    """
+    Test that referencing an attribute which is not available in the record raises the same error as logging does
+    """
+    logger = logging.getLogger('MissingField')
+    logger.setLevel(logging.DEBUG)
+    logger.handlers.clear()
+
+    formatter = OpenTracingFormatter(kv_format={'missing': '%(not_an_attribute)s'})
+    logger.addHandler(OpenTracingHandler(tracer=tracer, formatter=formatter))
+
+    with pytest.raises(ValueError):
+        with tracer.start_active_span('missing_field'):
+            logger.info(MESSAGE)
+
+
+@pytest.mark.parametrize('msg,args,expected', [
+    ('User %s logged in %d times', ('brian', 3),
+     {'event': 'info', 'message': 'User %s logged in %d times', 'args.0': 'brian', 'args.1': 3}),
+    ('%(user)s is %(age)d', ({'user': 'brian', 'age': 33},),
+     {'event': 'info', 'message': '%(user)s is %(age)d', 'args.user': 'brian', 'args.age': 33}),
+    ('100%% done', (), {'event': 'info', 'message': '100%% done'}),
+    (ValueError('spam'), (), {'event': 'info', 'message': 'spam'}),
+])
+def test_structured_message(tracer, msg, args, expected):
+    """
+    Test that structured messages log the template and the arguments separately
+    """
+    operation_name = 'structured_message'
+    logger = logging.getLogger('StructuredMessage')
+    logger.setLevel(logging.DEBUG)
+    logger.handlers.clear()
+
+    formatter = OpenTracingFormatter(structured_message=True)
+    logger.addHandler(OpenTracingHandler(tracer=tracer, formatter=formatter))
+
+    with tracer.start_active_span(operation_name):
+        logger.info(msg, *args)
+
+    check_finished_spans(tracer=tracer, operation_names_expected=[operation_name],
+                         logs_expected={operation_name: [expected]})
+
+
+@pytest.mark.parametrize('native_values,expected', [
+    (False, {'line': '12', 'line_str': '12', 'created': '1.500000', 'name': 'Native', 'source': 'spam.py:L12'}),
+    (True, {'line': 12, 'line_str': '12', 'created': 1.5, 'name': 'Native', 'source': 'spam.py:L12'}),
+])
+def test_native_values(native_values, expected):
+    """
+    Test that single directive formats keep the types of numbers if native values are enabled
+    """
+    formatter = OpenTracingFormatter(native_values=native_values, kv_format={
+        'line': '%(lineno)d',
+        'line_str': '%(lineno)s',
+        'created': '%(created)f',
+        'name': '%(name)s',
+        'source': '%(filename)s:L%(lineno)d',
+    })
+
+    record = logging.LogRecord('Native', logging.INFO, 'spam.py', 12, MESSAGE, None, None)
+    record.created = 1.5
+
+    key_values = formatter.format(record)
+
+    assert key_values == expected
+    assert [type(value) for value in key_values.values()] == [type(value) for value in expected.values()]
+
+
+@pytest.mark.parametrize('kv_format', [
+    None,
+    {'event': '%(levelname_lower)s', 'message': '%(message)s', 'time': '%(asctime)s', 'line': '%(lineno)d',
+     'exception': '%(exc_text)s', 'service': 'billing'},
+    # attributes of extra whose names are no identifiers
+    {'user': '%(user-id)s', 'request': '%(request.id)d of %(user-id)s'},
+])
+def test_mutate_record(kv_format):
+    """
+    Test that a formatter which does not mutate records formats them like a formatter which does
+    """
+    try:
+        raise ValueError('spam')
+    except ValueError:
+        exc_info = sys.exc_info()
+
+    def create_record() -> logging.LogRecord:
+        record = logging.LogRecord('Mutate', logging.ERROR, __file__, 12, 'Hello %s', ('World',), exc_info)
+        # both records must have the same time
+        record.created = 1600000000.5
+        record.msecs = 500.0
+        record.__dict__.update({'user-id': 7, 'request.id': 42})
+
+        return record
+
+    record = create_record()
+    attributes = dict(record.__dict__)
+
+    key_values = OpenTracingFormatter(kv_format=kv_format, mutate_record=False).format(record)
+
+    assert record.__dict__ == attributes
+    assert key_values == OpenTracingFormatter(kv_format=kv_format).format(create_record())
+
+
+def test_mutate_record_other_handlers(tracer):
+    """
+    Test that handlers after a handler which does not mutate records see the records as they have been created and
+    that shared formatting results are only used while the record is unchanged
+    """
+    class AttributeCollector(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.attributes = []
+
+        def emit(self, record: logging.LogRecord):
+            self.attributes.append(set(record.__dict__))
+
+    logger = logging.getLogger('MutateRecord')
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.handlers.clear()
+
+    collectors = [AttributeCollector(), AttributeCollector()]
+    logger.addHandler(collectors[0])
+    logger.addHandler(OpenTracingHandler(tracer=tracer, formatter=OpenTracingFormatter(mutate_record=False)))
+    logger.addHandler(collectors[1])
+
+    with tracer.start_active_span('mutate_record') as scope:
+        logger.info('Hello %s', 'World')
+
+    assert collectors[0].attributes == collectors[1].attributes
+    assert 'message' not in collectors[1].attributes[0]
+    assert scope.span.logs[0].key_values == {'event': 'info', 'message': 'Hello World'}
+
+    record = logging.LogRecord('MutateRecord', logging.INFO, __file__, 12, 'Hello %s', ('World',), None)
+    OpenTracingFormatter(share_results=True).format(record)
+    attributes = dict(record.__dict__)
+
+    assert OpenTracingFormatter(mutate_record=False, share_results=True).format(record)['message'] == 'Hello World'
+    assert record.__dict__ == attributes
+
+    record.msg = 'Goodbye %s'
+
+    assert OpenTracingFormatter(mutate_record=False, share_results=True).format(record)['message'] == 'Goodbye World'
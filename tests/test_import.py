@@ -0,0 +1,41 @@
+"""
+Test that importing the package is cheap
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+IMPORT_CHECK = """
+import sys
+import logging
+
+import logging_opentracing
+
+loaded = [name for name in ('subprocess', 'queue', 'logging_opentracing._version') if name in sys.modules]
+assert not loaded, f'Modules have been imported with the package: {loaded}'
+
+assert isinstance(logging_opentracing.__version__, str)
+assert 'logging_opentracing._version' in sys.modules
+"""
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='the version is resolved lazily since Python 3.7')
+def test_import_without_subprocesses():
+    """
+    Test that the import neither resolves the version, which can spawn git subprocesses, nor imports unneeded modules
+    """
+    subprocess.run([sys.executable, '-c', IMPORT_CHECK], check=True,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_unknown_attribute():
+    """
+    Test that accessing unknown attributes of the package still raises an AttributeError
+    """
+    import logging_opentracing
+
+    with pytest.raises(AttributeError):
+        logging_opentracing.spam
@@ -0,0 +1,76 @@
+"""
+Test the lock free mode of the OpenTracingHandler with multiple threads
+"""
+
+import threading
+from unittest.mock import MagicMock
+
+from logging_opentracing import OpenTracingHandler
+import pytest
+
+from .util import get_logger, tracer
+
+THREADS = 16
+LOGS_PER_THREAD = 200
+
+
+def test_no_handler_lock(tracer):
+    """
+    Test that the lock of the handler is not acquired
+    """
+    handler = OpenTracingHandler(tracer=tracer, lock_free=True)
+    handler.acquire = MagicMock(side_effect=AssertionError('the lock must not be acquired'))
+    logger = get_logger(handler, name='LockFree')
+
+    with tracer.start_active_span('no_handler_lock') as scope:
+        logger.info('lock free')
+
+    assert [log.key_values['message'] for log in scope.span.logs] == ['lock free']
+
+
+@pytest.mark.parametrize('kwargs', [dict(), {'batch_size': 7}, {'asynchronous': True, 'queue_size': 100}])
+def test_stress(tracer, kwargs):
+    """
+    Test that no record is lost or reordered when many threads log to their own spans and a shared span at once
+    """
+    handler = OpenTracingHandler(tracer=tracer, lock_free=True, **kwargs)
+    logger = get_logger(handler, name='LockFree')
+    barrier = threading.Barrier(THREADS)
+    shared_span = tracer.start_span('shared')
+
+    def log(thread: int):
+        barrier.wait()
+
+        with tracer.start_active_span(f'thread_{thread}'):
+            for i in range(LOGS_PER_THREAD):
+                logger.info('own %d', i, extra={'kv': {'thread': thread, 'seq': i}})
+                logger.info('shared %d', i, extra={'span': shared_span, 'kv': {'thread': thread, 'seq': i}})
+
+    threads = [threading.Thread(target=log, args=(thread,)) for thread in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    shared_span.finish()
+    handler.close()
+
+    spans = {span.operation_name: span for span in tracer.finished_spans()}
+    assert len(spans) == THREADS + 1
+
+    for thread in range(THREADS):
+        logs = [log.key_values for log in spans[f'thread_{thread}'].logs]
+        assert logs == [{'event': 'info', 'message': f'own {i}', 'thread': thread, 'seq': i}
+                        for i in range(LOGS_PER_THREAD)]
+
+    shared_logs = [log.key_values for log in spans['shared'].logs]
+    assert len(shared_logs) == THREADS * LOGS_PER_THREAD
+
+    assert all(log['message'] == f'shared {log["seq"]}' for log in shared_logs)
+
+    for thread in range(THREADS):
+        # the logs of each thread keep their order in the shared span
+        assert [log['seq'] for log in shared_logs if log['thread'] == thread] == list(range(LOGS_PER_THREAD))
+
+    assert handler.stats()['records_seen'] == 2 * THREADS * LOGS_PER_THREAD
+    assert handler.stats()['records_formatted'] == 2 * THREADS * LOGS_PER_THREAD
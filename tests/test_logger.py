@@ -0,0 +1,144 @@
+"""
+Test the logger which skips logging calls that could not be logged to a span
+"""
+
+import contextvars
+import logging
+
+from logging_opentracing import OpenTracingHandler, SpanAwareLogger, resolvers
+from logging_opentracing.capture import span_capturing_record_factory
+import pytest
+
+from .util import check_finished_spans, tracer
+
+TEST_LOG = {'event': 'info', 'message': 'This is a test log'}
+
+
+@pytest.fixture
+def created_records(monkeypatch):
+    """
+    Count the records which are created by span aware loggers while the test runs
+    """
+    records = []
+    make_record = SpanAwareLogger.makeRecord
+
+    def create(self, *args, **kwargs) -> logging.LogRecord:
+        record = make_record(self, *args, **kwargs)
+        records.append(record)
+
+        return record
+
+    monkeypatch.setattr(SpanAwareLogger, 'makeRecord', create)
+    return records
+
+
+def get_logger(*handlers: logging.Handler) -> SpanAwareLogger:
+    """
+    Get a logger without parent which only has the passed handlers
+    """
+    logger = SpanAwareLogger('SpanAware')
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+    for handler in handlers:
+        logger.addHandler(handler)
+
+    return logger
+
+
+def test_no_span(tracer, created_records):
+    """
+    Test that no record is created when no span is active
+    """
+    logger = get_logger(OpenTracingHandler(tracer=tracer))
+    logger.info(TEST_LOG['message'])
+
+    assert created_records == []
+
+
+def test_span(tracer, created_records):
+    """
+    Test that records are logged to active spans and to spans passed with extra
+    """
+    operation_names = ['span_aware_active', 'span_aware_passed']
+    logger = get_logger(OpenTracingHandler(tracer=tracer))
+
+    with tracer.start_active_span(operation_names[0]):
+        logger.info(TEST_LOG['message'])
+
+    with tracer.start_span(operation_names[1]) as span:
+        logger.info(TEST_LOG['message'], extra={'span': span})
+
+    assert len(created_records) == 2
+
+    # the spans finish one after the other and not nested, which is the reverse order of check_finished_spans
+    check_finished_spans(tracer=tracer, operation_names_expected=operation_names[::-1],
+                         logs_expected={operation_name: [TEST_LOG] for operation_name in operation_names})
+
+
+@pytest.mark.parametrize('handlers', [
+    # another handler needs the record
+    lambda tracer: [OpenTracingHandler(tracer=tracer), logging.NullHandler()],
+    # custom span resolvers can find spans which the logger does not know about
+    lambda tracer: [OpenTracingHandler(tracer=tracer, span_resolvers=[resolvers.scope_manager(tracer=tracer)])],
+    # logging.lastResort handles records of loggers without handlers
+    lambda tracer: [],
+])
+def test_not_skipped(tracer, created_records, handlers):
+    """
+    Test that records are created if a handler other than an OpenTracingHandler could process them
+    """
+    logger = get_logger(*handlers(tracer))
+    logger.info(TEST_LOG['message'])
+
+    assert len(created_records) == 1
+
+
+def test_logger_filter(tracer, created_records):
+    """
+    Test that records are created if the logger has filters
+    """
+    logger = get_logger(OpenTracingHandler(tracer=tracer))
+    logger.addFilter(lambda record: True)
+    logger.info(TEST_LOG['message'])
+
+    assert len(created_records) == 1
+
+
+def test_hierarchy(tracer, created_records):
+    """
+    Test that the handlers of the parent loggers are considered
+    """
+    parent = get_logger(logging.NullHandler())
+    logger = SpanAwareLogger('SpanAware.child')
+    logger.parent = parent
+    logger.addHandler(OpenTracingHandler(tracer=tracer))
+
+    logger.info(TEST_LOG['message'])
+    assert len(created_records) == 1
+
+    logger.propagate = False
+    logger.info(TEST_LOG['message'])
+    assert len(created_records) == 1
+
+
+def test_record_factory(tracer, created_records):
+    """
+    Test that records are created if a record factory could capture a span, e.g. from a context variable
+    """
+    current_span = contextvars.ContextVar('current_span', default=None)
+    logger = get_logger(OpenTracingHandler(tracer=tracer))
+    factory = logging.getLogRecordFactory()
+    logging.setLogRecordFactory(span_capturing_record_factory(resolver=resolvers.context_var(current_span)))
+
+    try:
+        with tracer.start_span('span_aware_captured') as span:
+            token = current_span.set(span)
+            logger.info(TEST_LOG['message'])
+            current_span.reset(token)
+    finally:
+        logging.setLogRecordFactory(factory)
+
+    assert len(created_records) == 1
+    check_finished_spans(tracer=tracer, operation_names_expected=['span_aware_captured'],
+                         logs_expected={'span_aware_captured': [TEST_LOG]})
@@ -0,0 +1,241 @@
+"""
+Test that records are formatted only once for multiple handlers
+"""
+
+import gc
+import logging
+from logging.handlers import SocketHandler
+import pickle
+import sys
+import weakref
+
+from logging_opentracing import OpenTracingHandler, OpenTracingFormatter
+from logging_opentracing import formatter as formatter_module
+from opentracing.mocktracer import MockTracer
+import pytest
+
+from .util import tracer
+
+
+class CountingMessage:
+    """
+    Message which counts how often it is converted into a string
+    """
+
+    def __init__(self, message: str):
+        self.message = message
+        self.count = 0
+
+    def __str__(self):
+        self.count += 1
+        return self.message
+
+
+def log(formatters, monkeypatch):
+    """
+    Log a message and an exception with one handler per formatter, each with its own tracer
+
+    :return: The message, the number of rendered stacks and the logs of each tracer
+    """
+    renders = []
+
+    for formatter in formatters:
+        renderer = formatter._stack_renderer
+        render = type(renderer)._render
+        monkeypatch.setattr(renderer, '_render', lambda tb, _render=render, _renderer=renderer:
+                            renders.append(tb) or _render(_renderer, tb))
+
+    tracers = [MockTracer() for _ in formatters]
+
+    logger = logging.getLogger('Memo')
+    logger.setLevel(logging.DEBUG)
+    # the log capturing of pytest would format the records as well
+    logger.propagate = False
+    logger.handlers.clear()
+
+    for tracer, formatter in zip(tracers, formatters):
+        logger.addHandler(OpenTracingHandler(tracer=tracer, formatter=formatter))
+
+    message = CountingMessage('spam')
+    scopes = [tracer.start_active_span('memo') for tracer in tracers]
+
+    try:
+        raise ValueError('eggs')
+    except ValueError:
+        logger.exception(message)
+
+    for scope in scopes:
+        scope.close()
+
+    return message, len(renders), [[log.key_values for log in tracer.finished_spans()[0].logs] for tracer in tracers]
+
+
+def test_same_format(monkeypatch):
+    """
+    Test that formatters with the same options share the formatted key-values
+    """
+    formatters = [OpenTracingFormatter(stack_cache_size=0, share_results=True),
+                  OpenTracingFormatter(stack_cache_size=0, share_results=True)]
+
+    assert formatters[0]._memo_key is formatters[1]._memo_key
+
+    message, renders, logs = log(formatters=formatters, monkeypatch=monkeypatch)
+
+    assert message.count == 1
+    assert renders == 1
+    assert logs[0] == logs[1]
+    assert logs[0][0]['message'] == 'spam'
+
+
+def test_different_format(monkeypatch):
+    """
+    Test that formatters with different formats still share the message and the stack
+    """
+    formatters = [OpenTracingFormatter(stack_cache_size=0, share_results=True),
+                  OpenTracingFormatter(stack_cache_size=0, share_results=True,
+                                       kv_format={'msg': '%(message)s', 'logger': '%(name)s'})]
+
+    message, renders, logs = log(formatters=formatters, monkeypatch=monkeypatch)
+
+    assert formatters[0]._memo_key is not formatters[1]._memo_key
+
+    assert message.count == 1
+    assert renders == 1
+    assert logs[0][0]['message'] == logs[1][0]['msg'] == 'spam'
+    assert logs[0][0]['stack'] == logs[1][0]['stack']
+    assert logs[1][0]['logger'] == 'Memo'
+
+
+def test_not_shared_by_default(monkeypatch):
+    """
+    Test that formatters do not share their results unless they are configured to
+    """
+    message, renders, logs = log(formatters=[OpenTracingFormatter(stack_cache_size=0),
+                                             OpenTracingFormatter(stack_cache_size=0)], monkeypatch=monkeypatch)
+
+    assert message.count == 2
+    assert renders == 2
+    assert logs[0] == logs[1]
+
+
+@pytest.mark.parametrize('kv_format', [None, {'message': '%(message)s', 'user': '%(user)s'}])
+def test_changed_record(kv_format):
+    """
+    Test that the results are not reused when a filter of a later handler replaces attributes of the record
+    """
+    tracers = [MockTracer(), MockTracer()]
+    handlers = [OpenTracingHandler(tracer=tracer, formatter=OpenTracingFormatter(kv_format=kv_format,
+                                                                                 share_results=True))
+                for tracer in tracers]
+
+    def redact(record: logging.LogRecord) -> bool:
+        record.msg = 'REDACTED'
+        record.args = ()
+        record.user = 'REDACTED'
+        return True
+
+    handlers[1].addFilter(redact)
+
+    logger = logging.getLogger('MemoRedact')
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.handlers.clear()
+
+    for handler in handlers:
+        logger.addHandler(handler)
+
+    scopes = [tracer.start_active_span('memo_redact') for tracer in tracers]
+    logger.info('password=%s', 'secret', extra={'user': 'brian'})
+
+    for scope in scopes:
+        scope.close()
+
+    logs = [tracer.finished_spans()[0].logs[0].key_values for tracer in tracers]
+
+    assert logs[0]['message'] == 'password=secret'
+    assert logs[1]['message'] == 'REDACTED'
+
+    if kv_format is not None:
+        assert logs[0]['user'] == 'brian'
+        assert logs[1]['user'] == 'REDACTED'
+
+
+@pytest.mark.parametrize('share_results', [False, True])
+def test_pickle(share_results):
+    """
+    Test that formatted records with exceptions can still be pickled by other handlers
+    """
+    try:
+        raise ValueError('spam')
+    except ValueError:
+        record = logging.LogRecord('Memo', logging.ERROR, __file__, 1, 'eggs', None, sys.exc_info())
+
+    OpenTracingFormatter(share_results=share_results).format(record)
+    data = SocketHandler('localhost', None).makePickle(record)
+
+    assert pickle.loads(data[4:])['msg'] == 'eggs'
+
+
+def test_share_key():
+    """
+    Test that subclasses only share their key-values with instances of the same share key
+    """
+    class ServiceFormatter(OpenTracingFormatter):
+        def __init__(self, service: str):
+            super().__init__(share_results=True)
+            self.service = service
+
+        def _format_message(self, record, values=None):
+            return {**super()._format_message(record=record, values=values), 'service.format': self.service}
+
+        def share_key(self):
+            return self.service
+
+    record = logging.LogRecord('Memo', logging.INFO, __file__, 1, 'spam', None, None)
+
+    assert ServiceFormatter('billing').format(record)['service.format'] == 'billing'
+    assert ServiceFormatter('shipping').format(record)['service.format'] == 'shipping'
+
+
+def test_copies(tracer):
+    """
+    Test that the handler gets a copy of the memoized key-values, which it can extend with additional key-values
+    """
+    formatter = OpenTracingFormatter(share_results=True)
+    record = logging.LogRecord('Memo', logging.INFO, __file__, 1, 'spam', None, None)
+
+    key_values = formatter.format(record)
+    key_values['extra'] = 'eggs'
+
+    assert formatter.format(record) == {'event': 'info', 'message': 'spam'}
+
+
+def test_interned_released():
+    """
+    Test that the objects which are shared by formatters with the same options are released with the formatters
+    """
+    gc.collect()
+    before = len(formatter_module._INTERNED)
+
+    formatters = [OpenTracingFormatter(kv_format={'event': 'static', 'number': str(i)}, share_results=True)
+                  for i in range(1000)]
+    record = logging.LogRecord('Memo', logging.INFO, __file__, 1, 'spam', None, None)
+
+    for formatter in formatters:
+        formatter.format(record)
+
+    # a compiled format and a memo key for each formatter
+    assert len(formatter_module._INTERNED) >= before + 2000
+
+    class SubFormatter(OpenTracingFormatter):
+        pass
+
+    sub_formatter = SubFormatter(share_results=True)
+    sub_formatter.format(record)
+    sub_formatter_type = weakref.ref(SubFormatter)
+
+    del formatters, formatter, sub_formatter, SubFormatter, record
+    gc.collect()
+
+    assert len(formatter_module._INTERNED) <= before
+    assert sub_formatter_type() is None
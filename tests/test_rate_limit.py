@@ -0,0 +1,49 @@
+"""
+Test limiting the rate of records per span
+"""
+
+import logging
+
+from logging_opentracing import OpenTracingHandler
+from logging_opentracing.span_state import TokenBucket
+
+from .util import check_finished_spans, tracer
+
+
+def test_rate_limit(tracer):
+    """
+    Test that records above the limit are suppressed and summarized when the span finishes
+    """
+    operation_name = 'rate_limit'
+
+    logger = logging.getLogger('RateLimit')
+    logger.setLevel(logging.DEBUG)
+    logger.handlers.clear()
+    logger.addHandler(OpenTracingHandler(tracer=tracer, rate_limits={logging.DEBUG: (0, 2), logging.WARNING: (0, 0)}))
+
+    with tracer.start_active_span(operation_name):
+        for i in range(5):
+            logger.debug(f'debug {i}')
+        logger.info('info 0')
+        logger.warning('warning 0')
+
+    check_finished_spans(tracer=tracer, operation_names_expected=[operation_name], logs_expected={operation_name: [
+        {'event': 'debug', 'message': 'debug 0'},
+        {'event': 'debug', 'message': 'debug 1'},
+        {'event': 'info', 'message': 'info 0'},
+        {'event': 'suppressed', 'message': '4 log records have been suppressed', 'suppressed.debug': 3,
+         'suppressed.warning': 1},
+    ]})
+
+
+def test_token_bucket():
+    """
+    Test that the token bucket is refilled with its rate
+    """
+    bucket = TokenBucket(rate=2, burst=1, now=0)
+
+    assert bucket.consume(now=0)
+    assert not bucket.consume(now=0.25)
+    assert bucket.consume(now=0.5)
+    assert bucket.consume(now=10)
+    assert not bucket.consume(now=10)
@@ -0,0 +1,85 @@
+"""
+Test resolving spans with span resolvers
+"""
+
+import asyncio
+import sys
+
+from logging_opentracing import OpenTracingHandler, resolvers
+import pytest
+
+from .util import check_finished_spans, get_logger, tracer
+
+TEST_LOG = {'event': 'info', 'message': 'This is a test log'}
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='contextvars are available since Python 3.7')
+def test_context_var(tracer):
+    """
+    Test that each asyncio task logs to the span in its context variable
+    """
+    from contextvars import ContextVar
+
+    current_span = ContextVar('current_span')
+    handler = OpenTracingHandler(tracer=tracer, span_resolvers=[resolvers.context_var(current_span)])
+    logger = get_logger(handler, name='Resolvers')
+    operation_names = ['task_0', 'task_1']
+
+    async def task(operation_name: str):
+        with tracer.start_span(operation_name) as span:
+            current_span.set(span)
+            await asyncio.sleep(0)
+            logger.info(f'{TEST_LOG["message"]} of {operation_name}')
+
+    async def main():
+        await asyncio.gather(*[task(operation_name) for operation_name in operation_names])
+
+    asyncio.run(main())
+
+    # the spans of both tasks finish in the order in which the tasks have been started
+    check_finished_spans(tracer=tracer, operation_names_expected=operation_names[::-1], logs_expected={
+        operation_name: [{**TEST_LOG, 'message': f'{TEST_LOG["message"]} of {operation_name}'}]
+        for operation_name in operation_names
+    })
+
+
+def test_custom_resolver(tracer):
+    """
+    Test that the resolvers are tried in their order and custom resolvers can be used
+    """
+    operation_name = 'custom_resolver'
+    span = tracer.start_span(operation_name)
+    calls = []
+
+    def not_found(record):
+        calls.append('not_found')
+        return None
+
+    def found(record):
+        calls.append('found')
+        return span
+
+    def never_called(record):
+        calls.append('never_called')
+        return None
+
+    handler = OpenTracingHandler(tracer=tracer, span_resolvers=[not_found, found, never_called])
+    logger = get_logger(handler, name='Resolvers')
+    logger.info(TEST_LOG['message'])
+    span.finish()
+
+    assert calls == ['not_found', 'found']
+    check_finished_spans(tracer=tracer, operation_names_expected=[operation_name],
+                         logs_expected={operation_name: [TEST_LOG]})
+
+
+def test_no_resolvers(tracer):
+    """
+    Test that no span is found without resolvers
+    """
+    logger = get_logger(OpenTracingHandler(tracer=tracer, span_resolvers=[]), name='Resolvers')
+
+    with tracer.start_active_span('no_resolvers'):
+        logger.info(TEST_LOG['message'])
+
+    assert tracer.finished_spans()[0].logs == []
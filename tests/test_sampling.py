@@ -0,0 +1,68 @@
+"""
+Test skipping the logs of spans which are not sampled
+"""
+
+from unittest.mock import MagicMock
+
+from logging_opentracing import OpenTracingHandler
+from logging_opentracing.sampling import context_sampled, sampling_priority_sampled
+from opentracing.ext import tags
+import pytest
+
+from .util import check_finished_spans, get_logger, tracer
+
+TEST_LOG = {'event': 'info', 'message': 'This is a sampled log'}
+
+
+@pytest.mark.parametrize('priority,logs_expected', [(None, [TEST_LOG]), (1, [TEST_LOG]), (0, [])])
+def test_sampling_priority(tracer, priority, logs_expected):
+    """
+    Test skipping the logs of a span with the sampling priority 0
+    """
+    operation_name = 'sampling_priority'
+    logger = get_logger(OpenTracingHandler(tracer=tracer, sampled_check=sampling_priority_sampled), name='Sampling')
+
+    with tracer.start_active_span(operation_name) as scope:
+        if priority is not None:
+            scope.span.set_tag(tags.SAMPLING_PRIORITY, priority)
+
+        logger.info(TEST_LOG['message'])
+
+    check_finished_spans(tracer=tracer, operation_names_expected=[operation_name],
+                         logs_expected={operation_name: logs_expected})
+
+
+def test_check_cached(tracer):
+    """
+    Test that a custom check is only called once for each span and that formatting is skipped
+    """
+    operation_name = 'sampled_check_cached'
+    sampled_check = MagicMock(return_value=False)
+    formatter = MagicMock()
+    handler = OpenTracingHandler(tracer=tracer, formatter=formatter, sampled_check=sampled_check)
+    logger = get_logger(handler, name='Sampling')
+
+    with tracer.start_active_span(operation_name) as scope:
+        for _ in range(3):
+            logger.info(TEST_LOG['message'])
+
+    sampled_check.assert_called_once_with(scope.span)
+    formatter.format.assert_not_called()
+    check_finished_spans(tracer=tracer, operation_names_expected=[operation_name],
+                         logs_expected={operation_name: []})
+
+
+@pytest.mark.parametrize('context,sampled', [
+    (object(), True),
+    (MagicMock(spec=['is_sampled'], is_sampled=MagicMock(return_value=False)), False),
+    (MagicMock(spec=['sampled'], sampled=True), True),
+    (MagicMock(spec=['flags'], flags=0x00), False),
+    (MagicMock(spec=['flags'], flags=0x01), True),
+])
+def test_context_sampled(context, sampled):
+    """
+    Test reading the sampling decision from different span contexts
+    """
+    span = MagicMock(context=context)
+
+    assert context_sampled(span) == sampled
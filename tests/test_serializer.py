@@ -0,0 +1,122 @@
+"""
+Test the serialization of the values which are logged to spans
+"""
+
+from collections import OrderedDict
+import logging
+
+from logging_opentracing import OpenTracingHandler
+from logging_opentracing.serializer import ValueSerializer
+import pytest
+
+from .util import tracer
+
+
+class Point:
+    def __init__(self, x: int, y: int):
+        self.x = x
+        self.y = y
+
+    def __repr__(self):
+        return f'Point({self.x}, {self.y})'
+
+
+class Point3D(Point):
+    pass
+
+
+@pytest.mark.parametrize('value,serialized', [
+    ('spam', 'spam'),
+    (42, 42),
+    (4.2, 4.2),
+    (True, True),
+    (None, None),
+    (ValueError, 'ValueError'),
+    (OrderedDict, 'collections.OrderedDict'),
+    (ValueError('eggs'), "ValueError('eggs')"),
+    (ValueError(), 'ValueError()'),
+    (ValueError(1, Point(1, 2)), 'ValueError(1, <tests.test_serializer.Point object>)'),
+    ([1, 2, 3], '[1, 2, 3]'),
+    ([1.5, None, True], '[1.5, None, True]'),
+    (list(range(20)), '[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, ...]'),
+    (Point(1, 2), '<tests.test_serializer.Point object>'),
+])
+def test_default_converters(value, serialized):
+    """
+    Test that primitives are passed through and other values are converted
+    """
+    assert ValueSerializer().serialize(value) == serialized
+
+
+def test_bounded_repr():
+    """
+    Test that the length of representations is bounded
+    """
+    serializer = ValueSerializer(max_repr_length=20)
+
+    assert serializer.serialize(['x' * 10]) == "['xxxxxxxxxx']"
+    assert serializer.serialize(['x' * 100]) == "['xxxxxxx...xxxxx..."
+    assert len(serializer.serialize(b'x' * 10 ** 6)) == 20
+    assert len(serializer.serialize({i: 'x' * 10 for i in range(5)})) == 20
+
+
+def test_repr_not_called():
+    """
+    Test that the possibly expensive repr of arbitrary objects is not called
+    """
+    class Expensive:
+        def __repr__(self):
+            raise AssertionError('repr must not be called')
+
+    assert ValueSerializer().serialize([Expensive()]) == \
+        '[<tests.test_serializer.test_repr_not_called.<locals>.Expensive object>]'
+
+
+def test_register():
+    """
+    Test that registered converters apply to subclasses and replace cached lookups
+    """
+    serializer = ValueSerializer()
+
+    assert serializer.serialize(Point3D(1, 2)) == '<tests.test_serializer.Point3D object>'
+
+    serializer.register(Point, lambda point: [point.x, point.y])
+
+    assert serializer.serialize(Point(1, 2)) == [1, 2]
+    assert serializer.serialize(Point3D(3, 4)) == [3, 4]
+
+    serializer = ValueSerializer(converters={Point3D: lambda point: 'three dimensional'})
+
+    assert serializer.serialize(Point3D(1, 2)) == 'three dimensional'
+    assert serializer.serialize(Point(1, 2)) == '<tests.test_serializer.Point object>'
+
+    serializer.register(Point, repr)
+
+    assert serializer.serialize(Point(1, 2)) == 'Point(1, 2)'
+
+
+def test_handler(tracer):
+    """
+    Test that the handler serializes the formatted and additional key-values
+    """
+    operation_name = 'serializer'
+
+    logger = logging.getLogger('Serializer')
+    logger.setLevel(logging.DEBUG)
+    logger.handlers.clear()
+    logger.addHandler(OpenTracingHandler(tracer=tracer, serializer=ValueSerializer()))
+
+    with tracer.start_active_span(operation_name):
+        logger.info('point', extra={'kv': {'point': Point(1, 2), 'count': 3}})
+
+        try:
+            raise ValueError('spam')
+        except ValueError:
+            logger.exception('exception')
+
+    logs = tracer.finished_spans()[0].logs
+
+    assert logs[0].key_values == {'event': 'info', 'message': 'point', 'point': '<tests.test_serializer.Point object>',
+                                     'count': 3}
+    assert logs[1].key_values['error.object'] == "ValueError('spam')"
+    assert logs[1].key_values['error.kind'] == 'ValueError'
@@ -0,0 +1,78 @@
+"""
+Test the state which the OpenTracingHandler keeps for each span
+"""
+
+import gc
+import logging
+import weakref
+
+from logging_opentracing import OpenTracingHandler
+from logging_opentracing.span_state import add_finish_callback
+from opentracing.mocktracer.span import MockSpan
+
+from .util import tracer
+
+TEST_LOG = {'event': 'info', 'message': 'This is a test log'}
+
+
+class FrozenSpan(MockSpan):
+    """
+    Span which does not allow to replace its method finish
+    """
+
+    def __setattr__(self, name, value):
+        if name == 'finish':
+            raise AttributeError('finish cannot be replaced')
+
+        super().__setattr__(name, value)
+
+
+def test_finish_callback(tracer):
+    """
+    Test that the callbacks are called once before the span is finished
+    """
+    span = tracer.start_span('finish_callback')
+    calls = []
+
+    assert add_finish_callback(span, lambda finished: calls.append((finished, finished.finished)))
+    span.finish()
+    span.finish()
+
+    assert calls == [(span, False)]
+    assert tracer.finished_spans()[0] is span
+
+
+def test_no_reference_cycle(tracer):
+    """
+    Test that spans whose finish has been wrapped are freed without the cyclic garbage collector
+    """
+    span = tracer.start_span('no_reference_cycle')
+    span_ref = weakref.ref(span)
+    add_finish_callback(span, lambda _: None)
+
+    gc.disable()
+
+    try:
+        del span
+        assert span_ref() is None
+    finally:
+        gc.enable()
+
+
+def test_finish_not_replaceable(tracer):
+    """
+    Test that the logs of spans without a finish callback are written right away instead of being buffered
+    """
+    logger = logging.getLogger('FinishNotReplaceable')
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.handlers.clear()
+    logger.addHandler(OpenTracingHandler(tracer=tracer, batch_size=100))
+
+    span = FrozenSpan(tracer, operation_name='finish_not_replaceable')
+
+    assert not add_finish_callback(span, lambda _: None)
+
+    logger.info(TEST_LOG['message'], extra={'span': span})
+
+    assert [log.key_values for log in span.logs] == [TEST_LOG]
@@ -0,0 +1,206 @@
+"""
+Test rendering the stacks of exceptions
+"""
+
+from io import StringIO
+import linecache
+import logging
+import sys
+import traceback
+from unittest.mock import MagicMock
+
+from logging_opentracing import OpenTracingFormatter
+from logging_opentracing.stack import StackRenderer, format_exc_text
+import pytest
+
+
+def fail(value: int):
+    """
+    Raise an exception at a fixed code location
+    """
+    raise ValueError(value)
+
+
+def exc_info_of(func, *args):
+    """
+    Get the exception information of an exception raised by a function
+    """
+    try:
+        func(*args)
+    except Exception:
+        return sys.exc_info()
+
+
+def print_tb(tb) -> str:
+    """
+    Render a traceback with traceback.print_tb
+    """
+    sio = StringIO()
+    traceback.print_tb(tb, file=sio)
+    return sio.getvalue()
+
+
+def test_render_cached():
+    """
+    Test that identical failures reuse the rendered stack
+    """
+    renderer = StackRenderer()
+
+    stacks = [renderer.render(exc_info_of(fail, i)[2]) for i in range(3)]
+
+    assert stacks[0] == print_tb(exc_info_of(fail, 0)[2])
+    assert stacks[0] is stacks[1] is stacks[2]
+
+
+def test_cache_bounded():
+    """
+    Test that the cache only keeps the most recently used stacks
+    """
+    renderer = StackRenderer(cache_size=1)
+
+    def fail_elsewhere():
+        raise KeyError()
+
+    first = renderer.render(exc_info_of(fail, 0)[2])
+    renderer.render(exc_info_of(fail_elsewhere)[2])
+
+    assert renderer.render(exc_info_of(fail, 0)[2]) is not first
+    assert len(renderer._cache) == 1
+
+
+def test_cache_disabled():
+    """
+    Test rendering without the cache
+    """
+    renderer = StackRenderer(cache_size=0)
+
+    assert renderer.render(exc_info_of(fail, 0)[2]) == print_tb(exc_info_of(fail, 0)[2])
+    assert len(renderer._cache) == 0
+
+
+def test_format_exc_text():
+    """
+    Test that the exception text composed from the stack is the same as the one of logging
+    """
+    exc_info = exc_info_of(fail, 42)
+
+    assert format_exc_text(exc_info, StackRenderer().render(exc_info[2])) == \
+        logging.Formatter().formatException(exc_info)
+
+
+def test_format_exc_text_chained():
+    """
+    Test that chained exceptions are left to logging
+    """
+    def fail_chained():
+        try:
+            fail(0)
+        except ValueError as e:
+            raise KeyError() from e
+
+    exc_info = exc_info_of(fail_chained)
+
+    assert format_exc_text(exc_info, StackRenderer().render(exc_info[2])) is None
+
+
+def test_exc_text_in_format():
+    """
+    Test that the exception text is only set on the record when the format uses it
+    """
+    logger = logging.getLogger('Stack')
+
+    for kv_format, exc_text_expected in [(None, None), ({'exc': '%(exc_text)s'}, True)]:
+        exc_info = exc_info_of(fail, 0)
+        record = logger.makeRecord(logger.name, logging.ERROR, __file__, 0, 'failed', None, exc_info)
+
+        key_values = OpenTracingFormatter(kv_format=kv_format).format(record)
+
+        assert key_values['stack'] == print_tb(exc_info[2])
+
+        if exc_text_expected:
+            assert key_values['exc'] == record.exc_text == logging.Formatter().formatException(exc_info)
+        else:
+            assert record.exc_text is None
+
+
+@pytest.mark.parametrize('mutate_record', [True, False])
+@pytest.mark.parametrize('options', [{'stack_source_lines': False}, {'stack_max_frames': 1}, {'stack_max_length': 50}])
+def test_exc_text_bounded(options, mutate_record):
+    """
+    Test that bounded stacks are only logged and the record keeps the full exception text for other handlers
+    """
+    logger = logging.getLogger('Stack')
+    exc_info = exc_info_of(fail, 0)
+    record = logger.makeRecord(logger.name, logging.ERROR, __file__, 0, 'failed', None, exc_info)
+    exc_text_full = logging.Formatter().formatException(exc_info)
+
+    formatter = OpenTracingFormatter(kv_format={'exc': '%(exc_text)s'}, mutate_record=mutate_record, **options)
+    key_values = formatter.format(record)
+
+    assert key_values['exc'] != exc_text_full
+    assert key_values['exc'].endswith(key_values['stack'] + 'ValueError: 0')
+    assert record.exc_text is None
+    assert logging.Formatter().format(record) == f'failed\n{exc_text_full}'
+
+    # the full text of other handlers is not replaced by the bounded text
+    assert formatter.format(record)['exc'] == key_values['exc']
+    assert record.exc_text == exc_text_full
+
+
+def recurse(depth: int):
+    """
+    Raise an exception with a deep stack
+    """
+    if depth == 0:
+        raise RecursionError()
+
+    recurse(depth - 1)
+
+
+def test_without_source_lines(monkeypatch):
+    """
+    Test that no source lines are looked up
+    """
+    exc_info = exc_info_of(fail, 0)
+    monkeypatch.setattr(linecache, 'getline', MagicMock(side_effect=AssertionError('no source lines')))
+    monkeypatch.setattr(linecache, 'updatecache', MagicMock(side_effect=AssertionError('no source lines')))
+
+    stack = StackRenderer(source_lines=False).render(exc_info[2])
+
+    assert stack == f'  File "{__file__}", line {exc_info[2].tb_lineno}, in exc_info_of\n' \
+                    f'  File "{__file__}", line {fail.__code__.co_firstlineno + 4}, in fail\n'
+
+
+@pytest.mark.parametrize('source_lines', [True, False])
+def test_max_frames(source_lines):
+    """
+    Test that only the outermost and innermost frames are kept
+    """
+    exc_info = exc_info_of(recurse, 20)
+
+    stack = StackRenderer(source_lines=source_lines, max_frames=4).render(exc_info[2])
+    lines = [line for line in stack.splitlines() if not line.startswith('    ')]
+
+    assert lines == [
+        f'  File "{__file__}", line {exc_info[2].tb_lineno}, in exc_info_of',
+        f'  File "{__file__}", line {recurse.__code__.co_firstlineno + 7}, in recurse',
+        '  ... 18 frames omitted ...',
+        f'  File "{__file__}", line {recurse.__code__.co_firstlineno + 7}, in recurse',
+        f'  File "{__file__}", line {recurse.__code__.co_firstlineno + 5}, in recurse',
+    ]
+    assert ('    recurse(depth - 1)' in stack.splitlines()) == source_lines
+
+
+def test_max_length():
+    """
+    Test that long stacks are truncated in the middle
+    """
+    exc_info = exc_info_of(recurse, 20)
+    stack_full = StackRenderer(source_lines=False).render(exc_info[2])
+
+    stack = StackRenderer(source_lines=False, max_length=200).render(exc_info[2])
+
+    assert len(stack) == 200
+    assert stack.startswith(stack_full[:50])
+    assert stack.endswith(stack_full[-50:])
+    assert f'... {len(stack_full) - 200} characters omitted ...' in stack
@@ -0,0 +1,51 @@
+"""
+Test the internal statistics of the OpenTracingHandler
+"""
+
+import logging
+
+from logging_opentracing import OpenTracingHandler
+import pytest
+
+from .util import tracer
+
+
+def test_stats(tracer):
+    """
+    Test that the counters and timings are updated
+    """
+    handler = OpenTracingHandler(tracer=tracer)
+
+    logger = logging.getLogger('Stats')
+    logger.setLevel(logging.DEBUG)
+    logger.handlers.clear()
+    logger.addHandler(handler)
+
+    logger.info('no span')
+
+    with tracer.start_active_span('stats'):
+        logger.info('in span')
+
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception('exception')
+
+        with pytest.raises(TypeError):
+            logger.info('wrong type', extra={'kv': 'no dict'})
+
+    stats = handler.stats()
+
+    assert {key: value for key, value in stats.items() if not key.startswith('time_')} == {
+        'records_seen': 4,
+        'records_dropped_no_span': 1,
+        'records_dropped_unsampled': 0,
+        'records_dropped_rate_limit': 0,
+        'records_dropped_budget': 0,
+        'records_formatted': 3,
+        'exceptions_rendered': 1,
+        'extra_kv_type_errors': 1,
+    }
+    assert stats['time_span_lookup'] > 0
+    assert stats['time_format'] > 0
+    assert stats['time_log_kv'] > 0
@@ -0,0 +1,89 @@
+"""
+Test keeping verbose logs in a ring buffer which is only logged when a span fails
+"""
+
+import logging
+
+from logging_opentracing import OpenTracingHandler
+import pytest
+
+from .util import check_finished_spans, tracer
+
+
+def log(level: str, message: str) -> dict:
+    """
+    Get the expected key-values of a log with the default format
+    """
+    return {'event': level, 'message': message}
+
+
+@pytest.fixture
+def logger(tracer):
+    """
+    Get a logger with an OpenTracingHandler with a ring buffer of size 2
+    """
+    logger = logging.getLogger('TailBuffer')
+    logger.setLevel(logging.DEBUG)
+
+    # this fixture is called multiple times and we have to remove the handlers added from the previous fixture call
+    logger.handlers.clear()
+    logger.addHandler(OpenTracingHandler(tracer=tracer, tail_buffer_size=2))
+
+    return logger
+
+
+def test_discarded(tracer, logger):
+    """
+    Test that the buffered records are discarded when the span finishes without an error
+    """
+    operation_name = 'tail_discarded'
+
+    with tracer.start_active_span(operation_name):
+        logger.debug('debug 0')
+        logger.info('info 0')
+        logger.warning('warning 0')
+
+    check_finished_spans(tracer=tracer, operation_names_expected=[operation_name],
+                         logs_expected={operation_name: [log('warning', 'warning 0')]})
+
+
+def test_error(tracer, logger):
+    """
+    Test that the last buffered records are logged with an error and that following records are logged right away
+    """
+    operation_name = 'tail_error'
+    records = []
+    logger.addFilter(lambda record: records.append(record) or True)
+
+    with tracer.start_active_span(operation_name):
+        logger.debug('debug 0')
+        logger.info('info 0')
+        logger.warning('warning 0')
+        logger.debug('debug 1')
+        logger.error('error 0')
+        logger.info('info 1')
+
+    check_finished_spans(tracer=tracer, operation_names_expected=[operation_name],
+                         logs_expected={operation_name: [log('warning', 'warning 0'), log('info', 'info 0'),
+                                                         log('debug', 'debug 1'), log('error', 'error 0'),
+                                                         log('info', 'info 1')]})
+
+    # the buffered logs keep the creation time of their records
+    assert tracer.finished_spans()[0].logs[1].timestamp == records[1].created
+
+
+def test_exception(tracer, logger):
+    """
+    Test that records with exception information trigger logging the buffer
+    """
+    with tracer.start_active_span('tail_exception'):
+        logger.info('info 0')
+
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.warning('warning 0', exc_info=True)
+
+    logs = tracer.finished_spans()[0].logs
+
+    assert [log.key_values['message'] for log in logs] == ['info 0', 'warning 0']
@@ -0,0 +1,80 @@
+"""
+Test the timestamps of the logs
+"""
+
+import logging
+import time
+
+from logging_opentracing import OpenTracingHandler
+from logging_opentracing.capture import SpanCaptureFilter
+from logging_opentracing.timestamps import MONOTONIC_ATTR, high_resolution
+import pytest
+
+from .util import get_logger, tracer
+
+
+class RecordCollector(logging.Handler):
+    """
+    Handler which keeps the handled records
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record: logging.LogRecord):
+        self.records.append(record)
+
+
+@pytest.mark.parametrize('kwargs', [
+    dict(),
+    dict(asynchronous=True),
+    dict(batch_size=10),
+    dict(tail_buffer_size=10),
+])
+def test_record_created(tracer, kwargs):
+    """
+    Test that the creation times of the records are used as timestamps on every path of the handler
+    """
+    handler = OpenTracingHandler(tracer=tracer, **kwargs)
+    logger = get_logger(handler, name='Timestamps')
+    collector = RecordCollector()
+    logger.addHandler(collector)
+
+    with tracer.start_active_span('timestamps') as scope:
+        logger.info('first')
+        time.sleep(0.01)
+        logger.error('second')
+        handler.flush()
+
+    assert [log.timestamp for log in scope.span.logs] == [record.created for record in collector.records]
+
+
+def test_high_resolution(tracer):
+    """
+    Test that high resolution timestamps are derived from the captured monotonic time
+    """
+    logger = get_logger(OpenTracingHandler(tracer=tracer, timestamp_source=high_resolution), name='Timestamps')
+    logger.addFilter(SpanCaptureFilter(tracer=tracer, monotonic=True))
+    collector = RecordCollector()
+    logger.addHandler(collector)
+
+    with tracer.start_active_span('high_resolution') as scope:
+        for i in range(10):
+            logger.info(f'log {i}')
+
+    timestamps = [log.timestamp for log in scope.span.logs]
+    monotonic = [getattr(record, MONOTONIC_ATTR) for record in collector.records]
+
+    assert timestamps == sorted(timestamps)
+    assert timestamps[-1] - timestamps[0] == pytest.approx(monotonic[-1] - monotonic[0], abs=1e-5)
+    assert timestamps[0] == pytest.approx(collector.records[0].created, abs=1.0)
+
+
+def test_high_resolution_fallback():
+    """
+    Test that records without monotonic time fall back to their creation time
+    """
+    record = logging.LogRecord('Timestamps', logging.INFO, __file__, 1, 'spam', None, None)
+
+    assert high_resolution(record) == record.created
@@ -69,3 +69,22 @@ def logger(tracer):
     logger.addHandler(OpenTracingHandler(tracer=tracer))
 
     return logger
+
+
+def get_logger(handler: logging.Handler, name: str) -> logging.Logger:
+    """
+    Get a logger which only has the passed handler
+
+    :param handler: Handler of the logger
+    :param name: Name of the logger
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.DEBUG)
+
+    # this function is called multiple times and we have to remove the handlers and filters added from the previous
+    # function call
+    logger.handlers.clear()
+    logger.filters.clear()
+    logger.addHandler(handler)
+
+    return logger